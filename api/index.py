@@ -1,21 +1,30 @@
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, ORJSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Set, Tuple
+from collections import defaultdict
+from itertools import count, islice
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 import os
 import json
+import asyncio
+import heapq
 import httpx
+import orjson
 import secrets
 import base64
 import hashlib
-from openai import OpenAI
+import logging
+import time
+from cachetools import TTLCache
 import re
 
+logger = logging.getLogger(__name__)
+
 # Initialize FastAPI
-app = FastAPI(title="Social Media Dashboard API")
+app = FastAPI(title="Social Media Dashboard API", default_response_class=ORJSONResponse)
 
 # Get base URL for callbacks
 BASE_URL = os.environ.get("VERCEL_URL", "")
@@ -35,49 +44,286 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ============ Simple Token Storage ============
-# In production, use Vercel KV or Postgres
-# For now, using environment variables + in-memory cache
+# ============ Shared HTTP Client ============
+# One pooled client for every outbound call so connections (and TLS sessions)
+# to the social APIs are reused across requests. Created lazily because the
+# Vercel handler runs with lifespan="off" and never fires startup events.
+
+http_client: Optional[httpx.AsyncClient] = None
+
+
+def parse_json(response: httpx.Response) -> Any:
+    """Decode a JSON response body straight from bytes with orjson."""
+    return orjson.loads(response.content)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=httpx.Timeout(10.0),
+        )
+    return http_client
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
+
+# ============ Storage ============
+# With Vercel KV (Redis) linked to the project, posts and tokens live there so
+# they survive cold starts and are shared by every instance. Commands go over
+# the KV REST API on the shared HTTP client. Without KV (local development)
+# everything falls back to the in-memory stores below.
+#
+# KV layout:
+#   post:{id}             JSON-encoded post
+#   post:counter          last issued post id
+#   posts:by_created      sorted set of post ids, scored by id (= creation order)
+#   posts:status:{s}      set of post ids with status s
+#   posts:type:{t}        set of post ids with content type t
+#   platform:{name}       JSON-encoded OAuth tokens
+#   data:version          bumped on every write, used for ETags
+
+KV_URL = os.environ.get("KV_REST_API_URL", "")
+KV_TOKEN = os.environ.get("KV_REST_API_TOKEN", "")
+KV_ENABLED = bool(KV_URL and KV_TOKEN)
+
+PLATFORMS = ("linkedin", "twitter", "facebook", "instagram")
 
 tokens_cache: Dict[str, Dict[str, Any]] = {}
 posts_db: Dict[int, dict] = {}
-post_counter = 0
+post_ids = count(1)
+
+# Secondary indexes: post ids by status / content type. Ids are assigned in
+# creation order, so newest-first is simply descending id.
+posts_by_status: Dict[str, Set[int]] = defaultdict(set)
+posts_by_type: Dict[str, Set[int]] = defaultdict(set)
+
+# Bumped on every write so read endpoints can answer 304 Not Modified
+data_version = 0
+BUMP_VERSION = ["INCR", "data:version"]
+# Distinguishes in-memory versions across restarts
+BOOT_ID = secrets.token_hex(4)
+
+
+async def kv_pipeline(*commands) -> list:
+    """Run Redis commands against Vercel KV in a single round trip."""
+    response = await get_http_client().post(
+        f"{KV_URL}/pipeline",
+        headers={"Authorization": f"Bearer {KV_TOKEN}"},
+        json=[list(command) for command in commands],
+    )
+    response.raise_for_status()
+    results = []
+    for item in parse_json(response):
+        if "error" in item:
+            raise RuntimeError(f"KV error: {item['error']}")
+        results.append(item.get("result"))
+    return results
+
+
+def bump_data_version():
+    global data_version
+    data_version += 1
+
+
+async def current_etag() -> str:
+    """Weak ETag covering all stored posts and tokens."""
+    if KV_ENABLED:
+        [version] = await kv_pipeline(["GET", "data:version"])
+        return f'W/"{version or 0}"'
+    return f'W/"{BOOT_ID}-{data_version}"'
+
+
+async def check_not_modified(request: Request, response: Response) -> Optional[Response]:
+    """Return a 304 if the client's cached copy is current, else tag ``response``."""
+    etag = await current_etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# Tokens configured through environment variables, used when nothing has been
+# connected through OAuth. Env vars are fixed for the life of the process.
+ENV_TOKENS: Dict[str, Dict[str, Any]] = {
+    "linkedin": {
+        "access_token": os.environ.get("LINKEDIN_ACCESS_TOKEN", ""),
+        "connected": bool(os.environ.get("LINKEDIN_ACCESS_TOKEN")),
+    },
+    "twitter": {
+        "access_token": os.environ.get("TWITTER_ACCESS_TOKEN", ""),
+        "access_token_secret": os.environ.get("TWITTER_ACCESS_TOKEN_SECRET", ""),
+        "connected": bool(os.environ.get("TWITTER_ACCESS_TOKEN")),
+    },
+    "facebook": {
+        "access_token": os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN", ""),
+        "page_id": os.environ.get("FACEBOOK_PAGE_ID", ""),
+        "connected": bool(os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN")),
+    },
+    "instagram": {
+        "access_token": os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN", ""),
+        "account_id": os.environ.get("INSTAGRAM_ACCOUNT_ID", ""),
+        "connected": bool(os.environ.get("INSTAGRAM_ACCOUNT_ID")),
+    },
+}
 
-def get_stored_tokens() -> Dict[str, Any]:
-    """Get tokens from cache or environment."""
-    global tokens_cache
 
-    # Check cache first
-    if tokens_cache:
-        return tokens_cache
+async def get_stored_tokens() -> Dict[str, Any]:
+    """Get tokens from storage or environment."""
+    if KV_ENABLED:
+        stored = await kv_pipeline(*(["GET", f"platform:{p}"] for p in PLATFORMS))
+        tokens = {p: json.loads(v) for p, v in zip(PLATFORMS, stored) if v}
+    else:
+        tokens = tokens_cache
 
-    # Fall back to environment variables
-    return {
-        "linkedin": {
-            "access_token": os.environ.get("LINKEDIN_ACCESS_TOKEN", ""),
-            "connected": bool(os.environ.get("LINKEDIN_ACCESS_TOKEN")),
-        },
-        "twitter": {
-            "access_token": os.environ.get("TWITTER_ACCESS_TOKEN", ""),
-            "access_token_secret": os.environ.get("TWITTER_ACCESS_TOKEN_SECRET", ""),
-            "connected": bool(os.environ.get("TWITTER_ACCESS_TOKEN")),
-        },
-        "facebook": {
-            "access_token": os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN", ""),
-            "page_id": os.environ.get("FACEBOOK_PAGE_ID", ""),
-            "connected": bool(os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN")),
-        },
-        "instagram": {
-            "access_token": os.environ.get("FACEBOOK_PAGE_ACCESS_TOKEN", ""),
-            "account_id": os.environ.get("INSTAGRAM_ACCOUNT_ID", ""),
-            "connected": bool(os.environ.get("INSTAGRAM_ACCOUNT_ID")),
-        },
-    }
+    return tokens or ENV_TOKENS
 
-def save_token(platform: str, token_data: Dict[str, Any]):
-    """Save token to cache."""
-    global tokens_cache
-    tokens_cache[platform] = {**token_data, "connected": True}
+async def save_token(platform: str, token_data: Dict[str, Any]):
+    """Save token to storage."""
+    token = {**token_data, "connected": True}
+    if KV_ENABLED:
+        await kv_pipeline(["SET", f"platform:{platform}", json.dumps(token)], BUMP_VERSION)
+    else:
+        tokens_cache[platform] = token
+        bump_data_version()
+
+
+async def delete_token(platform: str):
+    """Remove a platform's stored token."""
+    if KV_ENABLED:
+        await kv_pipeline(["DEL", f"platform:{platform}"], BUMP_VERSION)
+    else:
+        tokens_cache.pop(platform, None)
+        bump_data_version()
+
+
+async def next_post_id() -> int:
+    """Allocate a new post id."""
+    if KV_ENABLED:
+        [post_id] = await kv_pipeline(["INCR", "post:counter"])
+        return int(post_id)
+    return next(post_ids)
+
+
+async def load_post(post_id: int) -> Optional[dict]:
+    """Fetch a post by id, or None if it doesn't exist."""
+    if KV_ENABLED:
+        [raw] = await kv_pipeline(["GET", f"post:{post_id}"])
+        return json.loads(raw) if raw else None
+    return posts_db.get(post_id)
+
+
+async def insert_post(post: dict):
+    """Store a new post and index it."""
+    post_id = post["id"]
+    if KV_ENABLED:
+        await kv_pipeline(
+            ["SET", f"post:{post_id}", json.dumps(post)],
+            ["ZADD", "posts:by_created", post_id, post_id],
+            ["SADD", f"posts:status:{post['status']}", post_id],
+            ["SADD", f"posts:type:{post['content_type']}", post_id],
+            BUMP_VERSION,
+        )
+        return
+    posts_db[post_id] = post
+    posts_by_status[post["status"]].add(post_id)
+    posts_by_type[post["content_type"]].add(post_id)
+    bump_data_version()
+
+
+async def save_post(post: dict, previous_status: str):
+    """Persist changes to an existing post, moving it between status indexes if needed."""
+    post_id = post["id"]
+    status_changed = post["status"] != previous_status
+    if KV_ENABLED:
+        commands = [["SET", f"post:{post_id}", json.dumps(post)], BUMP_VERSION]
+        if status_changed:
+            commands.append(["SREM", f"posts:status:{previous_status}", post_id])
+            commands.append(["SADD", f"posts:status:{post['status']}", post_id])
+        await kv_pipeline(*commands)
+        return
+    # In memory, load_post hands out the stored dict itself, so the changes are
+    # already in place - only the status index needs updating
+    if status_changed:
+        posts_by_status[previous_status].discard(post_id)
+        posts_by_status[post["status"]].add(post_id)
+    bump_data_version()
+
+
+async def remove_post(post: dict):
+    """Delete a post and drop it from the indexes."""
+    post_id = post["id"]
+    if KV_ENABLED:
+        await kv_pipeline(
+            ["DEL", f"post:{post_id}"],
+            ["ZREM", "posts:by_created", post_id],
+            ["SREM", f"posts:status:{post['status']}", post_id],
+            ["SREM", f"posts:type:{post['content_type']}", post_id],
+            BUMP_VERSION,
+        )
+        return
+    del posts_db[post_id]
+    posts_by_status[post["status"]].discard(post_id)
+    posts_by_type[post["content_type"]].discard(post_id)
+    bump_data_version()
+
+
+async def query_posts(status: Optional[str], content_type: Optional[str], offset: int, limit: int):
+    """Return (page of posts newest first, total matching)."""
+    if KV_ENABLED:
+        return await query_posts_kv(status, content_type, offset, limit)
+
+    if not status and not content_type:
+        page = islice(reversed(posts_db), offset, offset + limit)
+        return [posts_db[i] for i in page], len(posts_db)
+
+    ids = None
+    if status:
+        ids = posts_by_status.get(status, set())
+    if content_type:
+        type_ids = posts_by_type.get(content_type, set())
+        ids = type_ids if ids is None else ids & type_ids
+
+    page = heapq.nlargest(offset + limit, ids)[offset:]
+    return [posts_db[i] for i in page], len(ids)
+
+
+async def query_posts_kv(status: Optional[str], content_type: Optional[str], offset: int, limit: int):
+    stop = offset + limit - 1
+
+    if not status and not content_type:
+        ids, total = await kv_pipeline(
+            ["ZREVRANGE", "posts:by_created", offset, stop],
+            ["ZCARD", "posts:by_created"],
+        )
+    else:
+        # Intersect the creation-ordered set with the filter sets; zero weights
+        # on the filters keep the creation order as the score.
+        filters = []
+        if status:
+            filters.append(f"posts:status:{status}")
+        if content_type:
+            filters.append(f"posts:type:{content_type}")
+        result_key = f"posts:query:{secrets.token_hex(8)}"
+        total, ids, _ = await kv_pipeline(
+            ["ZINTERSTORE", result_key, 1 + len(filters), "posts:by_created", *filters,
+             "WEIGHTS", 1, *([0] * len(filters))],
+            ["ZREVRANGE", result_key, offset, stop],
+            ["DEL", result_key],
+        )
+
+    if not ids:
+        return [], int(total)
+    [raw_posts] = await kv_pipeline(["MGET", *(f"post:{i}" for i in ids)])
+    return [json.loads(raw) for raw in raw_posts if raw], int(total)
 
 
 # ============ OAuth Configuration ============
@@ -106,9 +352,17 @@ OAUTH_CONFIG = {
     },
 }
 
-# Store OAuth states for CSRF protection
-oauth_states: Dict[str, str] = {}
-pkce_verifiers: Dict[str, str] = {}
+# Twitter authenticates token requests with HTTP Basic auth
+OAUTH_CONFIG["twitter"]["basic_auth"] = "Basic " + base64.b64encode(
+    f"{OAUTH_CONFIG['twitter']['client_id']}:{OAUTH_CONFIG['twitter']['client_secret']}".encode()
+).decode()
+
+# Store OAuth states for CSRF protection. Entries expire so abandoned flows
+# can't grow these without bound.
+OAUTH_STATE_TTL = 600
+
+oauth_states: TTLCache = TTLCache(maxsize=10000, ttl=OAUTH_STATE_TTL)
+pkce_verifiers: TTLCache = TTLCache(maxsize=10000, ttl=OAUTH_STATE_TTL)
 
 
 # ============ Models ============
@@ -152,6 +406,34 @@ def generate_pkce_pair():
     return verifier, challenge
 
 
+async def save_oauth_state(state: str, platform: str, verifier: Optional[str] = None):
+    """Remember an in-flight OAuth flow until its callback arrives."""
+    if KV_ENABLED:
+        # The callback may land on a different instance than /connect
+        value = json.dumps({"platform": platform, "verifier": verifier})
+        await kv_pipeline(["SET", f"oauth:state:{state}", value, "EX", OAUTH_STATE_TTL])
+        return
+    oauth_states[state] = platform
+    if verifier:
+        pkce_verifiers[state] = verifier
+
+
+async def pop_oauth_state(state: str) -> Tuple[Optional[str], Optional[str]]:
+    """Consume an OAuth state, returning its (platform, PKCE verifier)."""
+    if KV_ENABLED:
+        [raw] = await kv_pipeline(["GETDEL", f"oauth:state:{state}"])
+        if not raw:
+            return None, None
+        data = json.loads(raw)
+        return data["platform"], data["verifier"]
+    return oauth_states.pop(state, None), pkce_verifiers.pop(state, None)
+
+
+def expires_at(expires_in: Optional[int]) -> Optional[float]:
+    """Convert a relative ``expires_in`` into an absolute epoch timestamp."""
+    return time.time() + int(expires_in) if expires_in else None
+
+
 # ============ OAuth Routes ============
 
 @app.get("/api/auth/{platform}/connect")
@@ -170,7 +452,7 @@ async def oauth_connect(platform: str, request: Request):
 
     # Generate state for CSRF protection
     state = secrets.token_urlsafe(32)
-    oauth_states[state] = platform
+    verifier = None
 
     # Build callback URL
     callback_url = f"{BASE_URL}/api/auth/{platform}/callback"
@@ -187,10 +469,11 @@ async def oauth_connect(platform: str, request: Request):
     # Twitter requires PKCE
     if platform == "twitter":
         verifier, challenge = generate_pkce_pair()
-        pkce_verifiers[state] = verifier
         params["code_challenge"] = challenge
         params["code_challenge_method"] = "S256"
 
+    await save_oauth_state(state, platform, verifier)
+
     auth_url = f"{config['auth_url']}?{urlencode(params)}"
 
     return {"auth_url": auth_url}
@@ -208,110 +491,103 @@ async def oauth_callback(platform: str, code: str = None, state: str = None, err
         return RedirectResponse(f"{FRONTEND_URL}/settings?error=missing_params")
 
     # Verify state
-    if state not in oauth_states or oauth_states[state] != platform:
+    state_platform, verifier = await pop_oauth_state(state)
+    if state_platform != platform:
         return RedirectResponse(f"{FRONTEND_URL}/settings?error=invalid_state")
 
-    del oauth_states[state]
-
     config = OAUTH_CONFIG[platform]
     callback_url = f"{BASE_URL}/api/auth/{platform}/callback"
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Exchange code for token
-            token_data = {
-                "client_id": config["client_id"],
-                "client_secret": config["client_secret"],
-                "code": code,
-                "redirect_uri": callback_url,
-                "grant_type": "authorization_code",
-            }
+        client = get_http_client()
+        # Exchange code for token
+        token_data = {
+            "client_id": config["client_id"],
+            "client_secret": config["client_secret"],
+            "code": code,
+            "redirect_uri": callback_url,
+            "grant_type": "authorization_code",
+        }
 
-            # Twitter requires PKCE verifier
-            if platform == "twitter" and state in pkce_verifiers:
-                token_data["code_verifier"] = pkce_verifiers[state]
-                del pkce_verifiers[state]
+        # Twitter requires PKCE verifier
+        if platform == "twitter" and verifier:
+            token_data["code_verifier"] = verifier
 
-            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-            # Twitter requires Basic auth
-            if platform == "twitter":
-                credentials = base64.b64encode(
-                    f"{config['client_id']}:{config['client_secret']}".encode()
-                ).decode()
-                headers["Authorization"] = f"Basic {credentials}"
-                del token_data["client_secret"]
+        # Twitter requires Basic auth
+        if platform == "twitter":
+            headers["Authorization"] = config["basic_auth"]
+            del token_data["client_secret"]
 
-            response = await client.post(
-                config["token_url"],
-                data=token_data,
-                headers=headers
-            )
+        response = await client.post(
+            config["token_url"],
+            data=token_data,
+            headers=headers
+        )
 
-            if response.status_code != 200:
-                return RedirectResponse(f"{FRONTEND_URL}/settings?error=token_exchange_failed&details={response.text[:100]}")
+        if response.status_code != 200:
+            return RedirectResponse(f"{FRONTEND_URL}/settings?error=token_exchange_failed&details={response.text[:100]}")
 
-            tokens = response.json()
+        tokens = parse_json(response)
 
-            # Process based on platform
-            if platform == "linkedin":
-                save_token("linkedin", {
-                    "access_token": tokens.get("access_token"),
-                    "expires_in": tokens.get("expires_in"),
-                })
+        # Process based on platform
+        if platform == "linkedin":
+            # Resolve the member ID now so publishing doesn't need to
+            await save_token("linkedin", {
+                "access_token": tokens.get("access_token"),
+                "refresh_token": tokens.get("refresh_token"),
+                "expires_at": expires_at(tokens.get("expires_in")),
+                "user_id": await get_linkedin_user_id(tokens.get("access_token")),
+            })
 
-            elif platform == "twitter":
-                save_token("twitter", {
-                    "access_token": tokens.get("access_token"),
-                    "refresh_token": tokens.get("refresh_token"),
+        elif platform == "twitter":
+            await save_token("twitter", {
+                "access_token": tokens.get("access_token"),
+                "refresh_token": tokens.get("refresh_token"),
+                "expires_at": expires_at(tokens.get("expires_in")),
+            })
+
+        elif platform == "facebook":
+            # Get long-lived token
+            long_token_response = await client.get(
+                "https://graph.facebook.com/v18.0/oauth/access_token",
+                params={
+                    "grant_type": "fb_exchange_token",
+                    "client_id": config["client_id"],
+                    "client_secret": config["client_secret"],
+                    "fb_exchange_token": tokens.get("access_token"),
+                }
+            )
+            long_token = parse_json(long_token_response).get("access_token", tokens.get("access_token"))
+
+            # Get pages along with their linked Instagram account in one call
+            pages_response = await client.get(
+                "https://graph.facebook.com/v18.0/me/accounts",
+                params={
+                    "fields": "id,name,access_token,instagram_business_account",
+                    "access_token": long_token,
+                }
+            )
+            pages = parse_json(pages_response).get("data", [])
+
+            if pages:
+                page = pages[0]  # Use first page
+                await save_token("facebook", {
+                    "access_token": page.get("access_token"),
+                    "page_id": page.get("id"),
+                    "page_name": page.get("name"),
                 })
 
-            elif platform == "facebook":
-                # Get long-lived token
-                long_token_response = await client.get(
-                    "https://graph.facebook.com/v18.0/oauth/access_token",
-                    params={
-                        "grant_type": "fb_exchange_token",
-                        "client_id": config["client_id"],
-                        "client_secret": config["client_secret"],
-                        "fb_exchange_token": tokens.get("access_token"),
-                    }
-                )
-                long_token = long_token_response.json().get("access_token", tokens.get("access_token"))
-
-                # Get pages
-                pages_response = await client.get(
-                    "https://graph.facebook.com/v18.0/me/accounts",
-                    params={"access_token": long_token}
-                )
-                pages = pages_response.json().get("data", [])
-
-                if pages:
-                    page = pages[0]  # Use first page
-                    save_token("facebook", {
+                ig_account = page.get("instagram_business_account", {})
+
+                if ig_account:
+                    await save_token("instagram", {
                         "access_token": page.get("access_token"),
-                        "page_id": page.get("id"),
-                        "page_name": page.get("name"),
+                        "account_id": ig_account.get("id"),
                     })
 
-                    # Get Instagram account linked to this page
-                    ig_response = await client.get(
-                        f"https://graph.facebook.com/v18.0/{page['id']}",
-                        params={
-                            "fields": "instagram_business_account",
-                            "access_token": page.get("access_token"),
-                        }
-                    )
-                    ig_data = ig_response.json()
-                    ig_account = ig_data.get("instagram_business_account", {})
-
-                    if ig_account:
-                        save_token("instagram", {
-                            "access_token": page.get("access_token"),
-                            "account_id": ig_account.get("id"),
-                        })
-
-            return RedirectResponse(f"{FRONTEND_URL}/settings?connected={platform}")
+        return RedirectResponse(f"{FRONTEND_URL}/settings?connected={platform}")
 
     except Exception as e:
         return RedirectResponse(f"{FRONTEND_URL}/settings?error={str(e)[:100]}")
@@ -320,19 +596,120 @@ async def oauth_callback(platform: str, code: str = None, state: str = None, err
 @app.post("/api/auth/{platform}/disconnect")
 async def oauth_disconnect(platform: str):
     """Disconnect a platform."""
-    global tokens_cache
-    if platform in tokens_cache:
-        del tokens_cache[platform]
+    await delete_token(platform)
     return {"success": True, "message": f"{platform} disconnected"}
 
 
+# ============ Token Refresh ============
+# Short-lived tokens (Twitter's last 2 hours) are refreshed in the background
+# before they expire so publishing never waits on a refresh. The loop only runs
+# where startup events fire (not under the Vercel handler); publish_post still
+# refreshes already-expired tokens inline as a fallback.
+
+TOKEN_REFRESH_INTERVAL = 60
+TOKEN_REFRESH_MARGIN = 300
+
+async def refresh_platform_token(platform: str, token: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Exchange a platform's refresh token for a new access token."""
+    config = OAUTH_CONFIG[platform]
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": token["refresh_token"],
+        "client_id": config["client_id"],
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    # Twitter requires Basic auth
+    if platform == "twitter":
+        headers["Authorization"] = config["basic_auth"]
+    else:
+        data["client_secret"] = config["client_secret"]
+
+    response = await get_http_client().post(config["token_url"], data=data, headers=headers)
+    if response.status_code != 200:
+        return None
+
+    tokens = parse_json(response)
+    refreshed = {
+        **token,
+        "access_token": tokens.get("access_token"),
+        "refresh_token": tokens.get("refresh_token", token["refresh_token"]),
+        "expires_at": expires_at(tokens.get("expires_in")),
+    }
+    await save_token(platform, refreshed)
+    return refreshed
+
+
+async def refresh_expiring_tokens(tokens: Dict[str, Any], margin: float):
+    """Refresh tokens expiring within ``margin`` seconds, updating ``tokens`` in place."""
+    deadline = time.time() + margin
+    expiring = [
+        platform for platform in ("linkedin", "twitter")
+        if tokens.get(platform, {}).get("refresh_token")
+        and (tokens[platform].get("expires_at") or deadline) < deadline
+    ]
+    refreshed = await asyncio.gather(
+        *(refresh_platform_token(p, tokens[p]) for p in expiring),
+        return_exceptions=True,
+    )
+    for platform, token in zip(expiring, refreshed):
+        if isinstance(token, dict):
+            tokens[platform] = token
+        elif isinstance(token, BaseException):
+            logger.warning(f"{platform} token refresh failed: {token!r}")
+        else:
+            logger.warning(f"{platform} token refresh was rejected by the provider")
+
+
+async def token_refresher():
+    while True:
+        await asyncio.sleep(TOKEN_REFRESH_INTERVAL)
+        try:
+            await refresh_expiring_tokens(await get_stored_tokens(), TOKEN_REFRESH_MARGIN)
+        except Exception as e:
+            logger.warning(f"Token refresh failed: {e}")
+
+
+@app.on_event("startup")
+async def start_token_refresher():
+    app.state.token_refresher = asyncio.create_task(token_refresher())
+
+
+@app.on_event("shutdown")
+async def stop_token_refresher():
+    app.state.token_refresher.cancel()
+
+
 # ============ OpenAI Service ============
 
-def get_openai_client():
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+# Called directly over the shared HTTP client rather than through the OpenAI
+# SDK, which brings its own connection pool and a heavy import.
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+OPENAI_API_URL = "https://api.openai.com/v1"
+# Completions and image generation routinely outlast the shared 10s timeout
+OPENAI_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+def require_openai():
+    if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    return OpenAI(api_key=api_key)
+
+
+async def openai_request(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST to an OpenAI endpoint and return the decoded response."""
+    response = await get_http_client().post(
+        f"{OPENAI_API_URL}/{path}",
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        json=payload,
+        timeout=OPENAI_TIMEOUT,
+    )
+    if response.is_error:
+        # Gateway and proxy errors often come back as HTML, not JSON
+        try:
+            message = parse_json(response).get("error", {}).get("message", response.text)
+        except (orjson.JSONDecodeError, AttributeError):
+            message = response.text
+        raise RuntimeError(f"OpenAI returned {response.status_code}: {message}")
+    return parse_json(response)
 
 
 def get_educational_prompt(platforms: str) -> str:
@@ -400,10 +777,23 @@ Output ONLY JSON:
 {{"content": "[full post with hashtags]", "image_prompt": "[optional image description]"}}"""
 
 
+JSON_FENCE_RE = re.compile(r'^```json\s*', re.IGNORECASE)
+TRAILING_FENCE_RE = re.compile(r'```$')
+
+
 def parse_ai_response(raw: str) -> dict:
+    # JSON mode returns a bare object
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, dict):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+
+    # Fallback for replies wrapped in prose or code fences
     try:
-        json_str = re.sub(r'^```json\s*', '', raw, flags=re.IGNORECASE)
-        json_str = re.sub(r'```$', '', json_str)
+        json_str = JSON_FENCE_RE.sub('', raw)
+        json_str = TRAILING_FENCE_RE.sub('', json_str)
         start = json_str.find('{')
         end = json_str.rfind('}')
         if start != -1 and end != -1:
@@ -414,25 +804,42 @@ def parse_ai_response(raw: str) -> dict:
     return {"content": raw}
 
 
+def count_words(text: str) -> int:
+    # str.split() runs in C and beats counting regex matches, which allocates
+    # a match object per word
+    return len(text.split())
+
+
 # ============ Social Media Posting ============
 
-async def post_to_linkedin(content: str) -> dict:
-    tokens = get_stored_tokens().get("linkedin", {})
+async def get_linkedin_user_id(access_token: str) -> Optional[str]:
+    """Fetch the LinkedIn member ID (``sub``) for an access token."""
+    response = await get_http_client().get(
+        "https://api.linkedin.com/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if response.status_code != 200:
+        return None
+    return parse_json(response).get("sub")
+
+
+async def post_to_linkedin(content: str, tokens: Dict[str, Any]) -> dict:
     access_token = tokens.get("access_token")
 
     if not access_token:
         return {"success": False, "error": "LinkedIn not connected"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                "https://api.linkedin.com/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            if user_response.status_code != 200:
-                return {"success": False, "error": "Token expired. Please reconnect LinkedIn."}
+        client = get_http_client()
+        user_id = tokens.get("user_id")
+        cached = bool(user_id)
 
-            user_id = user_response.json().get("sub")
+        while True:
+            if not user_id:
+                user_id = await get_linkedin_user_id(access_token)
+                if not user_id:
+                    return {"success": False, "error": "Token expired. Please reconnect LinkedIn."}
+                tokens["user_id"] = user_id
 
             post_data = {
                 "author": f"urn:li:person:{user_id}",
@@ -456,15 +863,21 @@ async def post_to_linkedin(content: str) -> dict:
                 json=post_data
             )
 
-            if response.status_code in [200, 201]:
-                return {"success": True, "post_id": response.headers.get("x-restli-id", "")}
-            return {"success": False, "error": response.text}
+            # A cached member ID may be stale - refetch it once and retry
+            if response.status_code != 401 or not cached:
+                break
+            cached = False
+            user_id = None
+            tokens.pop("user_id", None)
+
+        if response.status_code in [200, 201]:
+            return {"success": True, "post_id": response.headers.get("x-restli-id", "")}
+        return {"success": False, "error": response.text}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-async def post_to_twitter(content: str) -> dict:
-    tokens = get_stored_tokens().get("twitter", {})
+async def post_to_twitter(content: str, tokens: Dict[str, Any]) -> dict:
     access_token = tokens.get("access_token")
 
     if not access_token:
@@ -474,26 +887,25 @@ async def post_to_twitter(content: str) -> dict:
         if len(content) > 280:
             content = content[:277] + "..."
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.twitter.com/2/tweets",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json",
-                },
-                json={"text": content}
-            )
+        client = get_http_client()
+        response = await client.post(
+            "https://api.twitter.com/2/tweets",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json",
+            },
+            json={"text": content}
+        )
 
-            if response.status_code in [200, 201]:
-                data = response.json()
-                return {"success": True, "post_id": data.get("data", {}).get("id", "")}
-            return {"success": False, "error": response.text}
+        if response.status_code in [200, 201]:
+            data = parse_json(response)
+            return {"success": True, "post_id": data.get("data", {}).get("id", "")}
+        return {"success": False, "error": response.text}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-async def post_to_facebook(content: str) -> dict:
-    tokens = get_stored_tokens().get("facebook", {})
+async def post_to_facebook(content: str, tokens: Dict[str, Any]) -> dict:
     access_token = tokens.get("access_token")
     page_id = tokens.get("page_id")
 
@@ -501,21 +913,57 @@ async def post_to_facebook(content: str) -> dict:
         return {"success": False, "error": "Facebook not connected"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://graph.facebook.com/v18.0/{page_id}/feed",
-                params={"access_token": access_token, "message": content}
-            )
-            data = response.json()
-            if "id" in data:
-                return {"success": True, "post_id": data["id"]}
-            return {"success": False, "error": data.get("error", {}).get("message", "Unknown error")}
+        client = get_http_client()
+        response = await client.post(
+            f"https://graph.facebook.com/v18.0/{page_id}/feed",
+            params={"access_token": access_token, "message": content}
+        )
+        data = parse_json(response)
+        if "id" in data:
+            return {"success": True, "post_id": data["id"]}
+        return {"success": False, "error": data.get("error", {}).get("message", "Unknown error")}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-async def post_to_instagram(content: str, image_url: str) -> dict:
-    tokens = get_stored_tokens().get("instagram", {})
+# Backoff (seconds) between Instagram container status checks
+IG_CONTAINER_POLL_DELAYS = (0.5, 1, 2, 4)
+
+
+async def create_instagram_container(account_id: str, access_token: str, image_url: str, caption: str) -> dict:
+    """Create an Instagram media container; Meta processes it asynchronously."""
+    response = await get_http_client().post(
+        f"https://graph.facebook.com/v18.0/{account_id}/media",
+        params={"access_token": access_token, "image_url": image_url, "caption": caption}
+    )
+    return parse_json(response)
+
+
+async def wait_for_instagram_container(container_id: str, access_token: str) -> str:
+    """Poll a media container until it leaves IN_PROGRESS, returning its status code."""
+    status_code = "IN_PROGRESS"
+    for delay in (0, *IG_CONTAINER_POLL_DELAYS):
+        await asyncio.sleep(delay)
+        response = await get_http_client().get(
+            f"https://graph.facebook.com/v18.0/{container_id}",
+            params={"fields": "status_code", "access_token": access_token}
+        )
+        status_code = parse_json(response).get("status_code", "FINISHED")
+        if status_code != "IN_PROGRESS":
+            break
+    return status_code
+
+
+async def publish_instagram_container(account_id: str, access_token: str, container_id: str) -> dict:
+    """Publish a processed media container."""
+    response = await get_http_client().post(
+        f"https://graph.facebook.com/v18.0/{account_id}/media_publish",
+        params={"access_token": access_token, "creation_id": container_id}
+    )
+    return parse_json(response)
+
+
+async def post_to_instagram(content: str, image_url: str, tokens: Dict[str, Any]) -> dict:
     access_token = tokens.get("access_token")
     account_id = tokens.get("account_id")
 
@@ -526,25 +974,20 @@ async def post_to_instagram(content: str, image_url: str) -> dict:
         return {"success": False, "error": "Instagram requires an image"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            container_response = await client.post(
-                f"https://graph.facebook.com/v18.0/{account_id}/media",
-                params={"access_token": access_token, "image_url": image_url, "caption": content}
-            )
-            container_data = container_response.json()
+        container_data = await create_instagram_container(account_id, access_token, image_url, content)
 
-            if "id" not in container_data:
-                return {"success": False, "error": container_data.get("error", {}).get("message", "Failed")}
+        if "id" not in container_data:
+            return {"success": False, "error": container_data.get("error", {}).get("message", "Failed")}
 
-            publish_response = await client.post(
-                f"https://graph.facebook.com/v18.0/{account_id}/media_publish",
-                params={"access_token": access_token, "creation_id": container_data["id"]}
-            )
-            publish_data = publish_response.json()
+        status_code = await wait_for_instagram_container(container_data["id"], access_token)
+        if status_code != "FINISHED":
+            return {"success": False, "error": f"Media container {status_code.lower()}"}
 
-            if "id" in publish_data:
-                return {"success": True, "post_id": publish_data["id"]}
-            return {"success": False, "error": publish_data.get("error", {}).get("message", "Failed")}
+        publish_data = await publish_instagram_container(account_id, access_token, container_data["id"])
+
+        if "id" in publish_data:
+            return {"success": True, "post_id": publish_data["id"]}
+        return {"success": False, "error": publish_data.get("error", {}).get("message", "Failed")}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -561,48 +1004,52 @@ async def health():
     return {"status": "healthy"}
 
 
+# OAuth / OpenAI configuration only depends on env vars
+OAUTH_CONFIGURED = {
+    "linkedin": bool(OAUTH_CONFIG["linkedin"]["client_id"]),
+    "twitter": bool(OAUTH_CONFIG["twitter"]["client_id"]),
+    "facebook": bool(OAUTH_CONFIG["facebook"]["client_id"]),
+    "instagram": bool(OAUTH_CONFIG["facebook"]["client_id"]),  # Uses Facebook OAuth
+}
+OPENAI_CONFIGURED = bool(OPENAI_API_KEY)
+
+
 @app.get("/api/platforms/status")
-async def get_platform_status():
-    tokens = get_stored_tokens()
-
-    # Check OAuth configuration
-    oauth_configured = {
-        "linkedin": bool(OAUTH_CONFIG["linkedin"]["client_id"]),
-        "twitter": bool(OAUTH_CONFIG["twitter"]["client_id"]),
-        "facebook": bool(OAUTH_CONFIG["facebook"]["client_id"]),
-        "instagram": bool(OAUTH_CONFIG["facebook"]["client_id"]),  # Uses Facebook OAuth
-    }
+async def get_platform_status(request: Request, response: Response):
+    not_modified = await check_not_modified(request, response)
+    if not_modified:
+        return not_modified
 
-    # Check OpenAI configuration
-    openai_configured = bool(os.environ.get("OPENAI_API_KEY"))
+    tokens = await get_stored_tokens()
+    facebook = tokens.get("facebook", {})
 
     return {
         "platforms": {
             "linkedin": {
                 "connected": tokens.get("linkedin", {}).get("connected", False),
-                "oauth_configured": oauth_configured["linkedin"],
+                "oauth_configured": OAUTH_CONFIGURED["linkedin"],
             },
             "twitter": {
                 "connected": tokens.get("twitter", {}).get("connected", False),
-                "oauth_configured": oauth_configured["twitter"],
+                "oauth_configured": OAUTH_CONFIGURED["twitter"],
             },
             "facebook": {
-                "connected": tokens.get("facebook", {}).get("connected", False),
-                "oauth_configured": oauth_configured["facebook"],
-                "page_name": tokens.get("facebook", {}).get("page_name", ""),
+                "connected": facebook.get("connected", False),
+                "oauth_configured": OAUTH_CONFIGURED["facebook"],
+                "page_name": facebook.get("page_name", ""),
             },
             "instagram": {
                 "connected": tokens.get("instagram", {}).get("connected", False),
-                "oauth_configured": oauth_configured["instagram"],
+                "oauth_configured": OAUTH_CONFIGURED["instagram"],
             },
         },
-        "openai_configured": openai_configured,
+        "openai_configured": OPENAI_CONFIGURED,
     }
 
 
 @app.post("/api/posts/generate")
 async def generate_content(request: GenerateContentRequest):
-    client = get_openai_client()
+    require_openai()
     platform_str = ", ".join(request.platforms)
 
     if request.content_type == "educational":
@@ -617,24 +1064,25 @@ async def generate_content(request: GenerateContentRequest):
         user_prompt = request.custom_prompt
 
     try:
-        response = client.chat.completions.create(
-            model=os.environ.get("OPENAI_MODEL", "gpt-4o"),
-            messages=[
+        response = await openai_request("chat/completions", {
+            "model": os.environ.get("OPENAI_MODEL", "gpt-4o"),
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            max_tokens=1500,
-            temperature=0.85
-        )
+            "max_tokens": 1500,
+            "temperature": 0.85,
+            "response_format": {"type": "json_object"},
+        })
 
-        raw = response.choices[0].message.content.strip()
+        raw = response["choices"][0]["message"]["content"].strip()
         parsed = parse_ai_response(raw)
+        content = parsed.get("content", raw)
+        now = datetime.now(timezone.utc).isoformat()
 
-        global post_counter
-        post_counter += 1
         post = {
-            "id": post_counter,
-            "content": parsed.get("content", raw),
+            "id": await next_post_id(),
+            "content": content,
             "image_prompt": parsed.get("image_prompt", ""),
             "image_url": None,
             "content_type": request.content_type,
@@ -646,11 +1094,11 @@ async def generate_content(request: GenerateContentRequest):
             "posted_ids": {},
             "posted_time": None,
             "error_message": None,
-            "word_count": len(parsed.get("content", raw).split()),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
+            "word_count": count_words(content),
+            "created_at": now,
+            "updated_at": now,
         }
-        posts_db[post_counter] = post
+        await insert_post(post)
 
         return {"success": True, "post": post, "generation_result": parsed}
 
@@ -660,28 +1108,26 @@ async def generate_content(request: GenerateContentRequest):
 
 @app.post("/api/posts/generate-image")
 async def generate_image(prompt: str = Query(...)):
-    client = get_openai_client()
+    require_openai()
 
     try:
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
-        )
-        return {"success": True, "image_url": response.data[0].url}
+        response = await openai_request("images/generations", {
+            "model": "dall-e-3",
+            "prompt": prompt,
+            "size": "1024x1024",
+            "quality": "standard",
+            "n": 1,
+        })
+        return {"success": True, "image_url": response["data"][0]["url"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/posts")
 async def create_post(request: CreatePostRequest):
-    global post_counter
-    post_counter += 1
-
+    now = datetime.now(timezone.utc).isoformat()
     post = {
-        "id": post_counter,
+        "id": await next_post_id(),
         "content": request.content,
         "image_url": request.image_url,
         "image_prompt": request.image_prompt,
@@ -694,52 +1140,56 @@ async def create_post(request: CreatePostRequest):
         "posted_ids": {},
         "posted_time": None,
         "error_message": None,
-        "word_count": len(request.content.split()),
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
+        "word_count": count_words(request.content),
+        "created_at": now,
+        "updated_at": now,
     }
-    posts_db[post_counter] = post
+    await insert_post(post)
 
     return {"success": True, "post": post}
 
 
 @app.get("/api/posts")
 async def list_posts(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
     content_type: Optional[str] = None,
     limit: int = Query(default=50, le=100),
     offset: int = 0
 ):
-    posts = list(posts_db.values())
-
-    if status:
-        posts = [p for p in posts if p["status"] == status]
-    if content_type:
-        posts = [p for p in posts if p["content_type"] == content_type]
+    not_modified = await check_not_modified(request, response)
+    if not_modified:
+        return not_modified
 
-    posts = sorted(posts, key=lambda x: x["created_at"], reverse=True)
-    posts = posts[offset:offset + limit]
+    posts, total = await query_posts(status, content_type, offset, limit)
 
-    return {"posts": posts, "total": len(posts)}
+    return {"posts": posts, "total": total}
 
 
 @app.get("/api/posts/{post_id}")
-async def get_post(post_id: int):
-    if post_id not in posts_db:
+async def get_post(post_id: int, request: Request, response: Response):
+    not_modified = await check_not_modified(request, response)
+    if not_modified:
+        return not_modified
+
+    post = await load_post(post_id)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
-    return {"post": posts_db[post_id]}
+    return {"post": post}
 
 
 @app.patch("/api/posts/{post_id}")
 async def update_post(post_id: int, request: UpdatePostRequest):
-    if post_id not in posts_db:
+    post = await load_post(post_id)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    post = posts_db[post_id]
+    previous_status = post["status"]
 
     if request.content is not None:
         post["content"] = request.content
-        post["word_count"] = len(request.content.split())
+        post["word_count"] = count_words(request.content)
     if request.image_url is not None:
         post["image_url"] = request.image_url
     if request.platforms is not None:
@@ -751,71 +1201,92 @@ async def update_post(post_id: int, request: UpdatePostRequest):
     if request.auto_post is not None:
         post["auto_post"] = request.auto_post
 
-    post["updated_at"] = datetime.utcnow().isoformat()
+    post["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await save_post(post, previous_status)
 
     return {"success": True, "post": post}
 
 
 @app.post("/api/posts/{post_id}/approve")
 async def approve_post(post_id: int):
-    if post_id not in posts_db:
+    post = await load_post(post_id)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    posts_db[post_id]["status"] = "approved"
-    posts_db[post_id]["updated_at"] = datetime.utcnow().isoformat()
+    previous_status = post["status"]
+    post["status"] = "approved"
+    post["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await save_post(post, previous_status)
 
-    return {"success": True, "post": posts_db[post_id]}
+    return {"success": True, "post": post}
 
 
 @app.post("/api/posts/{post_id}/publish")
 async def publish_post(post_id: int):
-    if post_id not in posts_db:
+    post = await load_post(post_id)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    post = posts_db[post_id]
+    previous_status = post["status"]
     content = post["content"]
     platforms = post["platforms"]
     image_url = post.get("image_url")
 
-    results = {}
+    tokens = await get_stored_tokens()
+    await refresh_expiring_tokens(tokens, 0)
+    names = []
+    coros = []
 
     for platform in platforms:
         if platform == "linkedin":
-            results["linkedin"] = await post_to_linkedin(content)
+            coros.append(post_to_linkedin(content, tokens.get("linkedin", {})))
         elif platform == "twitter":
-            results["twitter"] = await post_to_twitter(content)
+            coros.append(post_to_twitter(content, tokens.get("twitter", {})))
         elif platform == "facebook":
-            results["facebook"] = await post_to_facebook(content)
+            coros.append(post_to_facebook(content, tokens.get("facebook", {})))
         elif platform == "instagram":
-            results["instagram"] = await post_to_instagram(content, image_url or "")
+            coros.append(post_to_instagram(content, image_url or "", tokens.get("instagram", {})))
+        else:
+            continue
+        names.append(platform)
+
+    # Publish to all platforms concurrently
+    results = {}
+    for platform, result in zip(names, await asyncio.gather(*coros, return_exceptions=True)):
+        if isinstance(result, Exception):
+            result = {"success": False, "error": str(result)}
+        results[platform] = result
 
     all_success = all(r.get("success", False) for r in results.values()) if results else False
+    now = datetime.now(timezone.utc).isoformat()
 
     if all_success:
         post["status"] = "posted"
-        post["posted_time"] = datetime.utcnow().isoformat()
+        post["posted_time"] = now
         post["posted_ids"] = {p: r.get("post_id", "") for p, r in results.items()}
     else:
         errors = [f"{p}: {r.get('error')}" for p, r in results.items() if not r.get("success")]
         post["error_message"] = "; ".join(errors) if errors else "No platforms configured"
         if any(r.get("success") for r in results.values()):
             post["status"] = "posted"
-            post["posted_time"] = datetime.utcnow().isoformat()
+            post["posted_time"] = now
             post["posted_ids"] = {p: r.get("post_id", "") for p, r in results.items() if r.get("success")}
         else:
             post["status"] = "failed"
 
-    post["updated_at"] = datetime.utcnow().isoformat()
+    post["updated_at"] = now
+    await save_post(post, previous_status)
 
     return {"success": all_success, "post": post, "platform_results": results}
 
 
 @app.delete("/api/posts/{post_id}")
 async def delete_post(post_id: int):
-    if post_id not in posts_db:
+    post = await load_post(post_id)
+    if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    del posts_db[post_id]
+    await remove_post(post)
     return {"success": True, "message": "Post deleted"}
 
 
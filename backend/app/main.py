@@ -1,21 +1,32 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import orjson
 
 from app.config import get_settings
 from app.models import init_db
 from app.routers import posts_router, platforms_router
-from app.services import get_scheduler_service
 
 settings = get_settings()
 
+# Constant bodies for the root and health endpoints, encoded once
+_ROOT_JSON = orjson.dumps({
+    "message": "Social Media Dashboard API",
+    "version": "1.0.0",
+    "docs": "/docs"
+})
+_HEALTH_JSON = orjson.dumps({"status": "healthy"})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    from app.services import get_scheduler_service, get_social_media_manager
+    await get_social_media_manager().warmup()
     scheduler = get_scheduler_service()
-    scheduler.start()
+    await scheduler.start()
     print(" Social Media Dashboard API started")
     print(f" API docs available at /docs")
 
@@ -23,6 +34,8 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     scheduler.stop()
+    from app.services import close_http_client
+    await close_http_client()
     print(" Social Media Dashboard API stopped")
 
 
@@ -30,7 +43,8 @@ app = FastAPI(
     title="Social Media Dashboard API",
     description="API for managing and scheduling social media posts across multiple platforms",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -55,13 +69,9 @@ app.include_router(platforms_router, prefix="/api")
 
 @app.get("/")
 async def root():
-    return {
-        "message": "Social Media Dashboard API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+    return Response(_ROOT_JSON, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return Response(_HEALTH_JSON, media_type="application/json")
@@ -1,5 +1,5 @@
 from app.models.database import Base, engine, async_session, get_db, init_db
-from app.models.post import Post, PostStatus, ContentType, ScheduleConfig
+from app.models.post import Post, PostStatus, ContentType, ScheduleConfig, bulk_create_posts, count_words
 
 __all__ = [
     "Base",
@@ -11,4 +11,6 @@ __all__ = [
     "PostStatus",
     "ContentType",
     "ScheduleConfig",
+    "bulk_create_posts",
+    "count_words",
 ]
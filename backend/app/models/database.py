@@ -1,15 +1,48 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event, make_url, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
+import orjson
 
 settings = get_settings()
 
+# Keep connections open between requests and scheduler runs instead of
+# reconnecting each time. In-memory SQLite needs its single shared
+# connection, so it keeps SQLAlchemy's default pool
+_pool_options = {} if make_url(settings.database_url).database in (None, "", ":memory:") else {
+    "poolclass": AsyncAdaptedQueuePool,
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_pre_ping": True,
+    "pool_recycle": settings.db_pool_recycle,
+}
+
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
-    future=True
+    future=True,
+    **_pool_options,
+    insertmanyvalues_page_size=10_000,
+    # platforms / posted_ids are JSON columns decoded on every row load
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL + NORMAL sync turns each commit into one appended WAL write
+        # instead of two fsyncs of the rollback journal
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
+
+
 async_session = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
@@ -27,6 +60,21 @@ async def get_db():
             await session.close()
 
 
+# Indexes that were dropped from the models but may linger in older databases
+_OBSOLETE_INDEXES = ("ix_posts_scheduled_time",)
+
+
+def _create_schema(conn):
+    Base.metadata.create_all(conn)
+    # create_all skips tables that already exist, so add any indexes that
+    # were introduced after the database was first created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    for name in _OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_schema)
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, Enum, Index, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 from app.models.database import Base
 import enum
 from datetime import datetime
+from typing import Optional, List, Dict, Any
 
 
 class PostStatus(str, enum.Enum):
@@ -10,6 +12,7 @@ class PostStatus(str, enum.Enum):
     PENDING_APPROVAL = "pending_approval"
     APPROVED = "approved"
     SCHEDULED = "scheduled"
+    PUBLISHING = "publishing"  # Claimed by the scheduler, outcome not yet stored
     POSTED = "posted"
     FAILED = "failed"
 
@@ -23,6 +26,14 @@ class ContentType(str, enum.Enum):
     CUSTOM = "custom"
 
 
+def count_words(content: Optional[str]) -> int:
+    return len(content.split()) if content else 0
+
+
+def _default_word_count(context) -> int:
+    return count_words(context.get_current_parameters().get("content"))
+
+
 class Post(Base):
     __tablename__ = "posts"
 
@@ -34,52 +45,92 @@ class Post(Base):
     image_prompt = Column(Text, nullable=True)
 
     # Metadata
-    content_type = Column(String(50), default=ContentType.CUSTOM.value)
+    content_type = Column(String(50), default=ContentType.CUSTOM.value, index=True)
     topic = Column(String(255), nullable=True)
     hook_type = Column(String(50), nullable=True)
-    word_count = Column(Integer, default=0)
+    word_count = Column(Integer, default=_default_word_count)  # Derived from content on insert
 
     # Status & Scheduling
     status = Column(String(50), default=PostStatus.DRAFT.value)
     auto_post = Column(Boolean, default=False)  # True = auto post, False = needs approval
-    scheduled_time = Column(DateTime, nullable=True)
+    scheduled_time = Column(DateTime(timezone=True), nullable=True)
 
     # Platform targeting (JSON array of platforms)
     platforms = Column(JSON, default=["linkedin"])  # ["linkedin", "twitter", "facebook", "instagram"]
 
     # Posted info (JSON object with platform -> post_id mapping)
     posted_ids = Column(JSON, default={})
-    posted_time = Column(DateTime, nullable=True)
+    posted_time = Column(DateTime(timezone=True), nullable=True)
 
     # Errors (if any)
     error_message = Column(Text, nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Backs keyset pagination in list_posts (newest first)
+        Index("ix_posts_created_id", created_at.desc(), id.desc()),
+        # Status filters and the scheduler's due-posts range scan; also serves
+        # status-only lookups, so status has no index of its own
+        Index("ix_posts_status_scheduled", status, scheduled_time),
+        # Only posts still waiting to go out, so the scheduler's lookup stays
+        # small however many posts have already been published
+        Index(
+            "ix_posts_due",
+            scheduled_time,
+            postgresql_where=status.in_([PostStatus.APPROVED.value, PostStatus.SCHEDULED.value]),
+            sqlite_where=status.in_([PostStatus.APPROVED.value, PostStatus.SCHEDULED.value]),
+        ),
+    )
+    # Fetch server-generated timestamps with RETURNING on INSERT/UPDATE
+    # instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
     def to_dict(self):
+        # Read loaded values straight from the instance dict rather than going
+        # through SQLAlchemy's instrumented attributes for every column
+        g = self.__dict__.get
         return {
-            "id": self.id,
-            "content": self.content,
-            "image_url": self.image_url,
-            "image_prompt": self.image_prompt,
-            "content_type": self.content_type,
-            "topic": self.topic,
-            "hook_type": self.hook_type,
-            "word_count": self.word_count,
-            "status": self.status,
-            "auto_post": self.auto_post,
-            "scheduled_time": self.scheduled_time.isoformat() if self.scheduled_time else None,
-            "platforms": self.platforms or [],
-            "posted_ids": self.posted_ids or {},
-            "posted_time": self.posted_time.isoformat() if self.posted_time else None,
-            "error_message": self.error_message,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "id": g("id"),
+            "content": g("content"),
+            "image_url": g("image_url"),
+            "image_prompt": g("image_prompt"),
+            "content_type": g("content_type"),
+            "topic": g("topic"),
+            "hook_type": g("hook_type"),
+            "word_count": g("word_count"),
+            "status": g("status"),
+            "auto_post": g("auto_post"),
+            "scheduled_time": _isoformat(g("scheduled_time")),
+            "platforms": g("platforms") or [],
+            "posted_ids": g("posted_ids") or {},
+            "posted_time": _isoformat(g("posted_time")),
+            "error_message": g("error_message"),
+            "created_at": _isoformat(g("created_at")),
+            "updated_at": _isoformat(g("updated_at")),
         }
 
 
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+async def bulk_create_posts(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert many posts with multi-row INSERTs and return their ids in input order.
+
+    On Postgres, switch large imports (more than ~1k rows) to asyncpg's
+    copy_records_to_table instead.
+    """
+    if not rows:
+        return []
+    stmt = insert(Post).returning(Post.id, sort_by_parameter_order=True)
+    result = await db.execute(stmt, rows)
+    await db.commit()
+    return list(result.scalars())
+
+
 class ScheduleConfig(Base):
     __tablename__ = "schedule_configs"
 
@@ -92,4 +143,4 @@ class ScheduleConfig(Base):
     is_active = Column(Boolean, default=True)
     auto_generate = Column(Boolean, default=True)  # Auto generate content
     auto_post = Column(Boolean, default=False)  # Auto post without approval
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,15 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, update, delete, desc, func, tuple_
 from typing import Optional, List
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from pydantic import BaseModel, field_validator
 
-from app.models import Post, PostStatus, get_db
-from app.services import get_openai_service, get_social_media_manager, get_scheduler_service
+from app.models import Post, PostStatus, count_words, get_db
+from app import services
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
+# Plain status strings, bound once instead of going through the enum per request
+_STATUS_DRAFT = PostStatus.DRAFT.value
+_STATUS_PENDING_APPROVAL = PostStatus.PENDING_APPROVAL.value
+_STATUS_APPROVED = PostStatus.APPROVED.value
+_STATUS_SCHEDULED = PostStatus.SCHEDULED.value
+_STATUS_POSTED = PostStatus.POSTED.value
+_STATUS_FAILED = PostStatus.FAILED.value
+
+
+def _to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite keeps the wall-clock time and drops the offset, and the scheduler
+    # reads stored times back as UTC, so convert before it reaches the DB.
+    # Naive times are taken to be UTC already
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc)
+
 
 # Pydantic models for request/response
 class GenerateContentRequest(BaseModel):
@@ -30,6 +48,8 @@ class CreatePostRequest(BaseModel):
     auto_post: bool = False
     scheduled_time: Optional[datetime] = None
 
+    _scheduled_time_utc = field_validator("scheduled_time")(_to_utc)
+
 
 class UpdatePostRequest(BaseModel):
     content: Optional[str] = None
@@ -39,42 +59,33 @@ class UpdatePostRequest(BaseModel):
     scheduled_time: Optional[datetime] = None
     auto_post: Optional[bool] = None
 
+    _scheduled_time_utc = field_validator("scheduled_time")(_to_utc)
 
-class PostResponse(BaseModel):
-    id: int
-    content: str
-    image_url: Optional[str]
-    image_prompt: Optional[str]
-    content_type: str
-    topic: Optional[str]
-    status: str
-    auto_post: bool
-    scheduled_time: Optional[datetime]
-    platforms: List[str]
-    posted_ids: dict
-    posted_time: Optional[datetime]
-    error_message: Optional[str]
-    created_at: datetime
-    updated_at: datetime
-
-    class Config:
-        from_attributes = True
-
-
-@router.post("/generate", response_model=dict)
+
+@router.post("/generate")
 async def generate_content(
     request: GenerateContentRequest,
+    with_image: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
-    """Generate content using AI."""
-    openai_service = get_openai_service()
-
-    result = await openai_service.generate_content(
-        content_type=request.content_type,
-        topic=request.topic,
-        platforms=request.platforms,
-        custom_prompt=request.custom_prompt
-    )
+    """Generate content using AI, optionally with a DALL-E image for it."""
+    openai_service = services.get_openai_service()
+
+    image_result = None
+    if with_image:
+        result, image_result = await openai_service.generate_content_and_image(
+            content_type=request.content_type,
+            topic=request.topic,
+            platforms=request.platforms,
+            custom_prompt=request.custom_prompt
+        )
+    else:
+        result = await openai_service.generate_content(
+            content_type=request.content_type,
+            topic=request.topic,
+            platforms=request.platforms,
+            custom_prompt=request.custom_prompt
+        )
 
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result.get("error", "Content generation failed"))
@@ -82,30 +93,30 @@ async def generate_content(
     # Create post in database
     post = Post(
         content=result["content"],
+        image_url=image_result["image_url"] if image_result and image_result["success"] else None,
         image_prompt=result.get("image_prompt", ""),
         content_type=request.content_type,
         topic=request.topic or result.get("topic", ""),
         platforms=request.platforms,
         auto_post=request.auto_post,
-        status=PostStatus.PENDING_APPROVAL.value if not request.auto_post else PostStatus.APPROVED.value,
-        word_count=len(result["content"].split())
+        status=_STATUS_PENDING_APPROVAL if not request.auto_post else _STATUS_APPROVED
     )
 
     db.add(post)
     await db.commit()
-    await db.refresh(post)
 
     return {
         "success": True,
         "post": post.to_dict(),
-        "generation_result": result
+        "generation_result": result,
+        "image_result": image_result
     }
 
 
-@router.post("/generate-image", response_model=dict)
+@router.post("/generate-image")
 async def generate_image(prompt: str):
     """Generate an image using DALL-E."""
-    openai_service = get_openai_service()
+    openai_service = services.get_openai_service()
     result = await openai_service.generate_image(prompt)
 
     if not result["success"]:
@@ -114,7 +125,7 @@ async def generate_image(prompt: str):
     return result
 
 
-@router.post("/", response_model=dict)
+@router.post("/")
 async def create_post(
     request: CreatePostRequest,
     db: AsyncSession = Depends(get_db)
@@ -129,126 +140,180 @@ async def create_post(
         platforms=request.platforms,
         auto_post=request.auto_post,
         scheduled_time=request.scheduled_time,
-        status=PostStatus.SCHEDULED.value if request.scheduled_time else PostStatus.DRAFT.value,
-        word_count=len(request.content.split())
+        status=_STATUS_SCHEDULED if request.scheduled_time else _STATUS_DRAFT
     )
 
     db.add(post)
     await db.commit()
-    await db.refresh(post)
 
     # Schedule if needed
     if request.scheduled_time:
-        scheduler = get_scheduler_service()
-        scheduler.schedule_post(post.id, request.scheduled_time)
+        scheduler = services.get_scheduler_service()
+        scheduler.schedule_post(post.id, request.scheduled_time, post.status)
 
     return {"success": True, "post": post.to_dict()}
 
 
-@router.get("/", response_model=dict)
+# Columns for list views that only show a preview of each post
+_SUMMARY_COLUMNS = (
+    Post.id,
+    Post.status,
+    Post.content_type,
+    Post.topic,
+    Post.auto_post,
+    Post.scheduled_time,
+    Post.platforms,
+    Post.posted_time,
+    Post.created_at,
+    func.substr(Post.content, 1, 280).label("content_preview"),
+)
+
+
+def _decode_cursor(cursor: str) -> int:
+    """ID of the post a page ended on."""
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _cursor_key(cursor_id: int):
+    """Key of the cursor post, read back from the table itself so the
+    comparison uses the stored created_at rather than a re-serialised one."""
+    return select(Post.created_at, Post.id).where(Post.id == cursor_id).scalar_subquery()
+
+
+@router.get("/")
 async def list_posts(
     status: Optional[str] = None,
     content_type: Optional[str] = None,
     limit: int = Query(default=50, le=100),
-    offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    summary: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
-    """List all posts with optional filtering."""
-    query = select(Post).order_by(desc(Post.created_at))
+    """List posts newest first, paginated by the `next_cursor` of the previous page.
 
+    With `summary=true` only preview columns are loaded, with content cut to 280 chars.
+    """
+    filters = []
     if status:
-        query = query.where(Post.status == status)
+        filters.append(Post.status == status)
     if content_type:
-        query = query.where(Post.content_type == content_type)
+        filters.append(Post.content_type == content_type)
 
-    query = query.offset(offset).limit(limit)
-    result = await db.execute(query)
-    posts = result.scalars().all()
+    query = select(*_SUMMARY_COLUMNS) if summary else select(Post)
+    query = query.where(*filters)
+    cursor_id = _decode_cursor(cursor) if cursor else None
+    if cursor_id is not None:
+        query = query.where(tuple_(Post.created_at, Post.id) < _cursor_key(cursor_id))
 
-    return {
-        "posts": [p.to_dict() for p in posts],
-        "total": len(posts),
-        "offset": offset,
+    query = query.order_by(desc(Post.created_at), desc(Post.id)).limit(limit)
+    result = await db.execute(query)
+    if summary:
+        # Plain row dicts, no ORM entities to hydrate
+        posts = [dict(row) for row in result.mappings()]
+    else:
+        posts = [p.to_dict() for p in result.scalars()]
+
+    # A missing cursor post compares as NULL and matches nothing, which would
+    # look like the last page; only checked when the page came back empty
+    if cursor_id is not None and not posts and await db.scalar(
+        select(Post.id).where(Post.id == cursor_id)
+    ) is None:
+        raise HTTPException(status_code=400, detail="Unknown cursor")
+
+    response = {
+        "posts": posts,
+        "next_cursor": str(posts[-1]["id"]) if len(posts) == limit else None,
         "limit": limit
     }
+    if include_total:
+        response["total"] = await db.scalar(
+            select(func.count()).select_from(Post).where(*filters)
+        )
+    # Returned as a Response so FastAPI skips jsonable_encoder on the page
+    return ORJSONResponse(response)
 
 
-@router.get("/{post_id}", response_model=dict)
+@router.get("/{post_id}")
 async def get_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """Get a single post by ID."""
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
+    post = await db.get(Post, post_id)
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    return {"post": post.to_dict()}
+    return ORJSONResponse({"post": post.to_dict()})
 
 
-@router.patch("/{post_id}", response_model=dict)
+@router.patch("/{post_id}")
 async def update_post(
     post_id: int,
     request: UpdatePostRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """Update a post."""
-    result = await db.execute(select(Post).where(Post.id == post_id))
+    patch = request.model_dump(exclude_unset=True, exclude_none=True)
+    if "content" in patch:
+        patch["word_count"] = count_words(patch["content"])
+
+    result = await db.execute(
+        update(Post).where(Post.id == post_id).values(**patch).returning(Post)
+    )
     post = result.scalar_one_or_none()
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if request.content is not None:
-        post.content = request.content
-        post.word_count = len(request.content.split())
-    if request.image_url is not None:
-        post.image_url = request.image_url
-    if request.platforms is not None:
-        post.platforms = request.platforms
-    if request.status is not None:
-        post.status = request.status
-    if request.scheduled_time is not None:
-        post.scheduled_time = request.scheduled_time
-        # Update scheduler
-        scheduler = get_scheduler_service()
-        scheduler.schedule_post(post.id, request.scheduled_time)
-    if request.auto_post is not None:
-        post.auto_post = request.auto_post
-
     await db.commit()
-    await db.refresh(post)
+
+    # A new time or a status change (e.g. to approved) both affect whether
+    # and when the post goes out
+    if post.scheduled_time is not None and ("scheduled_time" in patch or "status" in patch):
+        scheduler = services.get_scheduler_service()
+        scheduler.schedule_post(post.id, post.scheduled_time, post.status)
 
     return {"success": True, "post": post.to_dict()}
 
 
-@router.post("/{post_id}/approve", response_model=dict)
+@router.post("/{post_id}/approve")
 async def approve_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """Approve a post for publishing."""
-    result = await db.execute(select(Post).where(Post.id == post_id))
+    result = await db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(status=_STATUS_APPROVED)
+        .returning(Post)
+    )
     post = result.scalar_one_or_none()
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    post.status = PostStatus.APPROVED.value
     await db.commit()
 
+    # Its job may already have fired and been skipped while it awaited approval
+    if post.scheduled_time is not None:
+        scheduler = services.get_scheduler_service()
+        scheduler.schedule_post(post.id, post.scheduled_time, post.status)
+
     return {"success": True, "post": post.to_dict()}
 
 
-@router.post("/{post_id}/publish", response_model=dict)
+@router.post("/{post_id}/publish")
 async def publish_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """Immediately publish a post to all configured platforms."""
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
+    post = await db.get(Post, post_id)
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if post.status == PostStatus.POSTED.value:
+    if post.status == _STATUS_POSTED:
         raise HTTPException(status_code=400, detail="Post already published")
 
-    social_manager = get_social_media_manager()
+    social_manager = services.get_social_media_manager()
 
     results = await social_manager.post_to_platforms(
         content=post.content,
@@ -257,32 +322,25 @@ async def publish_post(post_id: int, db: AsyncSession = Depends(get_db)):
     )
 
     # Update post status
-    all_success = all(r.get("success", False) for r in results.values())
+    now = datetime.now(timezone.utc)
+    posted_ids, errors = services.split_results(results)
+    all_success = not errors
 
     if all_success:
-        post.status = PostStatus.POSTED.value
-        post.posted_time = datetime.utcnow()
-        post.posted_ids = {
-            platform: result.get("post_id", "")
-            for platform, result in results.items()
-        }
+        post.status = _STATUS_POSTED
+        post.posted_time = now
+        post.posted_ids = posted_ids
     else:
-        errors = [f"{p}: {r.get('error', 'Unknown')}" for p, r in results.items() if not r.get("success")]
         post.error_message = "; ".join(errors)
 
-        if any(r.get("success") for r in results.values()):
-            post.status = PostStatus.POSTED.value
-            post.posted_time = datetime.utcnow()
-            post.posted_ids = {
-                platform: result.get("post_id", "")
-                for platform, result in results.items()
-                if result.get("success")
-            }
+        if posted_ids:
+            post.status = _STATUS_POSTED
+            post.posted_time = now
+            post.posted_ids = posted_ids
         else:
-            post.status = PostStatus.FAILED.value
+            post.status = _STATUS_FAILED
 
     await db.commit()
-    await db.refresh(post)
 
     return {
         "success": all_success,
@@ -291,16 +349,14 @@ async def publish_post(post_id: int, db: AsyncSession = Depends(get_db)):
     }
 
 
-@router.delete("/{post_id}", response_model=dict)
+@router.delete("/{post_id}")
 async def delete_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a post."""
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
+    result = await db.execute(delete(Post).where(Post.id == post_id).returning(Post.id))
 
-    if not post:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    await db.delete(post)
     await db.commit()
 
     return {"success": True, "message": "Post deleted"}
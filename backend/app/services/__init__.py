@@ -1,12 +1,25 @@
-from app.services.openai_service import OpenAIService, get_openai_service
-from app.services.social_media import SocialMediaManager, get_social_media_manager
-from app.services.scheduler import SchedulerService, get_scheduler_service
-
-__all__ = [
-    "OpenAIService",
-    "get_openai_service",
-    "SocialMediaManager",
-    "get_social_media_manager",
-    "SchedulerService",
-    "get_scheduler_service",
-]
+from importlib import import_module
+
+# Services are imported on first use so that app startup doesn't pay for
+# the OpenAI SDK, tweepy and APScheduler until something needs them
+_LAZY_EXPORTS = {
+    "OpenAIService": "app.services.openai_service",
+    "get_openai_service": "app.services.openai_service",
+    "SocialMediaManager": "app.services.social_media",
+    "get_social_media_manager": "app.services.social_media",
+    "close_http_client": "app.services.social_media",
+    "split_results": "app.services.social_media",
+    "SchedulerService": "app.services.scheduler",
+    "get_scheduler_service": "app.services.scheduler",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
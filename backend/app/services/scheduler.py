@@ -1,134 +1,192 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-from datetime import datetime, timedelta
-from typing import Optional, Callable
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Callable, Dict, Any, List
+import asyncio
 import logging
+import time
 
 from app.models import Post, PostStatus
 from app.models.database import async_session
-from app.services.social_media import get_social_media_manager
-from sqlalchemy import select, and_
+from app.services.social_media import get_social_media_manager, split_results
+from sqlalchemy import Row, select, update
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Due posts published at once per tick, to stay inside platform rate limits
+MAX_CONCURRENT_PUBLISHES = 8
+# Overdue posts loaded, published and committed per page
+PUBLISH_BATCH_SIZE = 100
+
+# Only these posts may go out without a manual publish
+PUBLISHABLE_STATUSES = (PostStatus.APPROVED.value, PostStatus.SCHEDULED.value)
+
+
 class SchedulerService:
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        # Jobs are kept in memory: the posts table is the source of truth and
+        # start() re-arms every pending post from it, so a persistent job
+        # store would only add synchronous DB writes on the event loop
+        self.scheduler = AsyncIOScheduler(
+            job_defaults={"coalesce": True, "misfire_grace_time": None}
+        )
         self._started = False
+        self._publish_slots = asyncio.Semaphore(MAX_CONCURRENT_PUBLISHES)
 
-    def start(self):
+    async def start(self):
         if not self._started:
             self.scheduler.start()
             self._started = True
+            await self._arm_pending_posts()
             logger.info("Scheduler started")
 
-            # Add job to check for scheduled posts every minute
-            self.scheduler.add_job(
-                self.check_scheduled_posts,
-                CronTrigger(minute="*"),
-                id="check_scheduled_posts",
-                replace_existing=True
-            )
-
     def stop(self):
         if self._started:
             self.scheduler.shutdown()
             self._started = False
             logger.info("Scheduler stopped")
 
-    async def check_scheduled_posts(self):
-        """Check for posts that need to be published."""
-        logger.info("Checking for scheduled posts...")
-
+    async def _arm_pending_posts(self):
+        """Arm jobs for every approved or scheduled post with a time set."""
         async with async_session() as session:
-            now = datetime.utcnow()
-
-            # Find posts that are approved/scheduled and due
-            query = select(Post).where(
-                and_(
-                    Post.status.in_([PostStatus.APPROVED.value, PostStatus.SCHEDULED.value]),
-                    Post.scheduled_time <= now,
+            result = await session.execute(
+                select(Post.id, Post.scheduled_time, Post.status).where(
+                    Post.status.in_(PUBLISHABLE_STATUSES),
                     Post.scheduled_time.isnot(None)
                 )
             )
 
-            result = await session.execute(query)
-            posts = result.scalars().all()
-
-            social_manager = get_social_media_manager()
-
-            for post in posts:
-                logger.info(f"Publishing post {post.id} to {post.platforms}")
-
-                try:
-                    results = await social_manager.post_to_platforms(
-                        content=post.content,
-                        platforms=post.platforms or ["linkedin"],
-                        image_url=post.image_url
-                    )
-
-                    # Update post status
-                    all_success = all(r.get("success", False) for r in results.values())
-
-                    if all_success:
-                        post.status = PostStatus.POSTED.value
-                        post.posted_time = datetime.utcnow()
-                        post.posted_ids = {
-                            platform: result.get("post_id", "")
-                            for platform, result in results.items()
-                        }
-                        logger.info(f"Post {post.id} published successfully")
-                    else:
-                        # Partial or full failure
-                        errors = [
-                            f"{p}: {r.get('error', 'Unknown')}"
-                            for p, r in results.items()
-                            if not r.get("success")
-                        ]
-                        post.error_message = "; ".join(errors)
-
-                        # If at least one succeeded, mark as posted with errors
-                        if any(r.get("success") for r in results.values()):
-                            post.status = PostStatus.POSTED.value
-                            post.posted_time = datetime.utcnow()
-                            post.posted_ids = {
-                                platform: result.get("post_id", "")
-                                for platform, result in results.items()
-                                if result.get("success")
-                            }
-                        else:
-                            post.status = PostStatus.FAILED.value
-
-                        logger.warning(f"Post {post.id} had errors: {post.error_message}")
-
-                    await session.commit()
-
-                except Exception as e:
-                    logger.error(f"Error publishing post {post.id}: {e}")
-                    post.status = PostStatus.FAILED.value
-                    post.error_message = str(e)
-                    await session.commit()
-
-    def schedule_post(self, post_id: int, scheduled_time: datetime):
-        """Schedule a specific post for publishing."""
-        job_id = f"post_{post_id}"
+        now = datetime.now(timezone.utc)
+        due = []
+        for post_id, scheduled_time, status in result:
+            if _as_utc(scheduled_time) <= now:
+                due.append(post_id)
+            else:
+                self.schedule_post(post_id, scheduled_time, status)
 
-        # Remove existing job if any
-        existing_job = self.scheduler.get_job(job_id)
-        if existing_job:
-            self.scheduler.remove_job(job_id)
+        if due:
+            logger.info(f"Publishing {len(due)} overdue posts")
+            self.scheduler.add_job(
+                self.publish_due_posts,
+                args=[due],
+                id="publish_due_posts",
+                replace_existing=True
+            )
 
-        # Don't schedule if time is in the past
-        if scheduled_time <= datetime.utcnow():
-            logger.warning(f"Cannot schedule post {post_id} - time is in the past")
-            return False
+    async def publish_due_posts(self, post_ids: list[int]):
+        """Publish a batch of overdue posts together, a page at a time."""
+        last_id = 0
+        while True:
+            # Keyset pages by id, each claimed and written back in its own
+            # short transaction: no transaction stays open while posts go out
+            # over the network, and a crash only loses the page in flight
+            page = (
+                select(Post.id)
+                .where(
+                    Post.id.in_(post_ids),
+                    Post.status.in_(PUBLISHABLE_STATUSES),
+                    Post.id > last_id
+                )
+                .order_by(Post.id)
+                .limit(PUBLISH_BATCH_SIZE)
+            )
+            posts = await _claim(Post.id.in_(page))
 
+            if not posts:
+                return
+            last_id = posts[-1].id
+
+            # Each page is published concurrently and its outcomes written
+            # with one bulk UPDATE by primary key
+            facebook_batch = self._start_facebook_batch(posts)
+            updates = await asyncio.gather(*(
+                self._process_due_post(post, facebook_batch) for post in posts
+            ))
+            async with async_session() as session:
+                await session.execute(update(Post), updates)
+                await session.commit()
+
+    def _start_facebook_batch(self, posts: List[Row]) -> Optional[asyncio.Task]:
+        """Send every Facebook-bound post in the chunk as one Graph API batch.
+
+        The task resolves to {post_id: result}; None if batching doesn't apply.
+        """
+        facebook = get_social_media_manager().facebook
+        facebook_posts = [p for p in posts if "facebook" in (p.platforms or [])]
+        if not facebook.enabled or len(facebook_posts) < 2:
+            return None
+
+        async def run() -> Dict[int, Dict[str, Any]]:
+            results = await facebook.post_batch([(p.content, p.image_url) for p in facebook_posts])
+            return dict(zip((p.id for p in facebook_posts), results))
+
+        return asyncio.create_task(run())
+
+    async def _process_due_post(
+        self,
+        post: Row,
+        facebook_batch: Optional[asyncio.Task] = None
+    ) -> Dict[str, Any]:
+        """Publish one due post and return the column values to write back."""
+        async with self._publish_slots:
+            logger.info(f"Publishing post {post.id} to {post.platforms}")
+
+            try:
+                platforms = post.platforms or ["linkedin"]
+                batched = facebook_batch is not None and "facebook" in platforms
+                if batched:
+                    platforms = [p for p in platforms if p != "facebook"]
+
+                social_manager = get_social_media_manager()
+                results = await social_manager.post_to_platforms(
+                    content=post.content,
+                    platforms=platforms,
+                    image_url=post.image_url
+                )
+                if batched:
+                    try:
+                        batch_results = await facebook_batch
+                    except Exception as e:
+                        batch_results = {}
+                        logger.error(f"Facebook batch failed: {e}")
+                    # Graph can answer with fewer entries than were sent
+                    results["facebook"] = batch_results.get(post.id, {
+                        "success": False,
+                        "error": "No result in Graph batch response",
+                        "platform": "facebook"
+                    })
+
+                return _publish_outcome(post.id, results)
+
+            except Exception as e:
+                logger.error(f"Error publishing post {post.id}: {e}")
+                return {"id": post.id, "status": PostStatus.FAILED.value, "error_message": str(e)}
+
+    def schedule_post(self, post_id: int, scheduled_time: datetime, status: str):
+        """Schedule a specific post for publishing."""
+        job_id = f"post_{post_id}"
+        scheduled_time = _as_utc(scheduled_time)
+
+        # Nothing polls for due posts, so a time already in the past is
+        # published right away rather than dropped - but only once the post
+        # may be published at all
+        if scheduled_time.timestamp() <= time.time():
+            if status not in PUBLISHABLE_STATUSES:
+                logger.warning(f"Post {post_id} scheduled in the past but not approved - not publishing")
+                return False
+            logger.warning(f"Post {post_id} scheduled in the past - publishing now")
+            trigger = None
+        else:
+            trigger = DateTrigger(run_date=scheduled_time)
+
+        # replace_existing swaps out any earlier job for this post, so
+        # there's no separate lookup and delete
         self.scheduler.add_job(
             self._publish_single_post,
-            DateTrigger(run_date=scheduled_time),
+            trigger,
             args=[post_id],
             id=job_id,
             replace_existing=True
@@ -139,44 +197,22 @@ class SchedulerService:
 
     async def _publish_single_post(self, post_id: int):
         """Publish a single post by ID."""
-        async with async_session() as session:
-            result = await session.execute(select(Post).where(Post.id == post_id))
-            post = result.scalar_one_or_none()
-
-            if not post:
-                logger.error(f"Post {post_id} not found")
-                return
-
-            if post.status == PostStatus.POSTED.value:
-                logger.info(f"Post {post_id} already published")
-                return
-
-            social_manager = get_social_media_manager()
-
-            results = await social_manager.post_to_platforms(
-                content=post.content,
-                platforms=post.platforms or ["linkedin"],
-                image_url=post.image_url
-            )
-
-            all_success = all(r.get("success", False) for r in results.values())
-
-            if all_success:
-                post.status = PostStatus.POSTED.value
-                post.posted_time = datetime.utcnow()
-                post.posted_ids = {
-                    platform: result.get("post_id", "")
-                    for platform, result in results.items()
-                }
-            else:
-                errors = [
-                    f"{p}: {r.get('error', 'Unknown')}"
-                    for p, r in results.items()
-                    if not r.get("success")
-                ]
-                post.error_message = "; ".join(errors)
-                post.status = PostStatus.FAILED.value
+        claimed = await _claim(Post.id == post_id)
+        if not claimed:
+            logger.info(f"Post {post_id} missing or not approved/scheduled - skipping")
+            return
+        post = claimed[0]
+
+        social_manager = get_social_media_manager()
+
+        results = await social_manager.post_to_platforms(
+            content=post.content,
+            platforms=post.platforms or ["linkedin"],
+            image_url=post.image_url
+        )
 
+        async with async_session() as session:
+            await session.execute(update(Post), [_publish_outcome(post_id, results)])
             await session.commit()
 
     def get_scheduled_jobs(self):
@@ -191,11 +227,66 @@ class SchedulerService:
 
 
 # Singleton instance
-_scheduler_service: Optional[SchedulerService] = None
-
-
+@lru_cache()
 def get_scheduler_service() -> SchedulerService:
-    global _scheduler_service
-    if _scheduler_service is None:
-        _scheduler_service = SchedulerService()
-    return _scheduler_service
+    return SchedulerService()
+
+
+async def _claim(criterion) -> List[Row]:
+    """Flip matching approved/scheduled posts to PUBLISHING and commit, returning
+    what publishing needs, ordered by id.
+
+    The status change is the claim: a second worker, an overlapping job or a
+    restart no longer sees these posts as publishable, which holds on SQLite
+    too, where SELECT ... FOR UPDATE is ignored. A post left in PUBLISHING by
+    a crash is never retried automatically, since it may already be out.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(Post)
+            .where(criterion, Post.status.in_(PUBLISHABLE_STATUSES))
+            .values(status=PostStatus.PUBLISHING.value)
+            .returning(Post.id, Post.content, Post.platforms, Post.image_url)
+        )
+        posts = sorted(result.all(), key=lambda post: post.id)
+        await session.commit()
+    return posts
+
+
+def _publish_outcome(post_id: int, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Column values to store for a post given its per-platform results."""
+    posted_at = datetime.now(timezone.utc)
+    posted_ids, errors = split_results(results)
+
+    if not errors:
+        logger.info(f"Post {post_id} published successfully")
+        return {
+            "id": post_id,
+            "status": PostStatus.POSTED.value,
+            "posted_time": posted_at,
+            "posted_ids": posted_ids
+        }
+
+    # Partial or full failure
+    changes = {"id": post_id, "error_message": "; ".join(errors)}
+
+    # If at least one succeeded, mark as posted with errors
+    if posted_ids:
+        changes["status"] = PostStatus.POSTED.value
+        changes["posted_time"] = posted_at
+        changes["posted_ids"] = posted_ids
+    elif any(result.get("unknown") for result in results.values()):
+        # It may have gone out; leave it claimed rather than FAILED, which
+        # invites a republish and a duplicate
+        changes["status"] = PostStatus.PUBLISHING.value
+    else:
+        changes["status"] = PostStatus.FAILED.value
+
+    logger.warning(f"Post {post_id} had errors: {changes['error_message']}")
+    return changes
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Stored times are UTC; SQLite hands them back naive
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
@@ -1,10 +1,102 @@
+import asyncio
+import logging
+import random
+import time
 import httpx
 import tweepy
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+from urllib.parse import urlencode
 from app.config import get_settings
-import json
+import orjson
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Per-platform cap so one slow API doesn't hold up the whole publish
+PLATFORM_TIMEOUT = 15
+
+# Per-request timeout, well inside PLATFORM_TIMEOUT so a slow request ends
+# on its own instead of being cancelled mid-flight and recorded as failed,
+# with room left for a backoff and one retry
+HTTP_TIMEOUT = 5.0
+
+# Platforms whose SDK calls run in a worker thread. Cancelling the await
+# doesn't stop the thread, so a timeout here could report a post as failed
+# that still goes out; they are left to finish instead
+THREADED_PLATFORMS = frozenset({"twitter"})
+
+TWEET_MAX_LENGTH = 280
+
+# Never mutated, so every ugcPosts payload can share it
+LINKEDIN_PUBLIC_VISIBILITY = {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"}
+
+# Most sub-requests the Graph API accepts in one batch call
+FACEBOOK_BATCH_LIMIT = 50
+# A batch runs up to 50 posts server-side, far slower than a single call
+FACEBOOK_BATCH_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Shared HTTP client so LinkedIn/Facebook/Instagram calls reuse pooled
+# connections instead of a new TCP + TLS handshake per request
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Responses that mean the request wasn't processed and is safe to resend.
+# 504 is left out: the post may have gone through before the gateway gave up
+RETRY_STATUSES = frozenset({429, 502, 503})
+MAX_ATTEMPTS = 3
+# Longer Retry-After waits would blow through PLATFORM_TIMEOUT anyway
+MAX_RETRY_DELAY = 5.0
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            # Retries connection failures; HTTP-level retries are in send_with_retry
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                retries=3
+            ),
+            timeout=HTTP_TIMEOUT
+        )
+    return _http_client
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> Optional[float]:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        delay = 0.5 * 2 ** (attempt - 1) + random.uniform(0, 0.25)
+    else:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            return None
+    return delay if delay <= MAX_RETRY_DELAY else None
+
+
+async def send_with_retry(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request on the shared client, backing off on rate limits and
+    transient gateway errors (honouring Retry-After)."""
+    client = get_http_client()
+    started = time.monotonic()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        response = await client.request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_ATTEMPTS:
+            return response
+        delay = _retry_delay(response, attempt)
+        # Give up rather than start a retry PLATFORM_TIMEOUT would cut off
+        if delay is None or time.monotonic() - started + delay + HTTP_TIMEOUT > PLATFORM_TIMEOUT:
+            return response
+        await asyncio.sleep(delay)
+    return response
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class TwitterService:
@@ -34,21 +126,38 @@ class TwitterService:
             )
             self.api = tweepy.API(auth)
 
+    @staticmethod
+    def _truncate_for_twitter(content: str) -> str:
+        """Fit content into a tweet, counting length in UTF-16 code units as
+        Twitter does, so emoji-heavy posts aren't rejected as too long."""
+        # Each character is at most two code units, so short content always fits
+        if len(content) <= TWEET_MAX_LENGTH // 2:
+            return content
+
+        encoded = content.encode("utf-16-le")
+        if len(encoded) <= TWEET_MAX_LENGTH * 2:
+            return content
+
+        # Cutting mid surrogate pair leaves half an emoji, which decoding drops
+        cut = encoded[:(TWEET_MAX_LENGTH - 3) * 2]
+        return cut.decode("utf-16-le", errors="ignore") + "..."
+
     async def post(self, content: str, image_path: Optional[str] = None) -> Dict[str, Any]:
         if not self.enabled:
             return {"success": False, "error": "Twitter not configured"}
 
         try:
-            # Truncate content for Twitter's 280 char limit
-            if len(content) > 280:
-                content = content[:277] + "..."
+            content = self._truncate_for_twitter(content)
 
+            # tweepy is synchronous; run its HTTP calls in a worker thread so
+            # they don't block the event loop
             media_ids = None
             if image_path:
-                media = self.api.media_upload(image_path)
+                media = await asyncio.to_thread(self.api.media_upload, image_path)
                 media_ids = [media.media_id]
 
-            response = self.client.create_tweet(
+            response = await asyncio.to_thread(
+                self.client.create_tweet,
                 text=content,
                 media_ids=media_ids
             )
@@ -70,20 +179,33 @@ class LinkedInService:
         self.enabled = bool(settings.linkedin_access_token)
         self.access_token = settings.linkedin_access_token
         self.base_url = "https://api.linkedin.com/v2"
+        self._post_headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+            "X-Restli-Protocol-Version": "2.0.0"
+        }
+        # The token's member ID never changes, so look it up once
+        self._user_id: Optional[str] = None
+        self._user_id_lock = asyncio.Lock()
 
     async def get_user_id(self) -> Optional[str]:
         """Get the authenticated user's LinkedIn ID."""
         if not self.enabled:
             return None
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/userinfo",
-                headers={"Authorization": f"Bearer {self.access_token}"}
-            )
-            if response.status_code == 200:
-                return response.json().get("sub")
-        return None
+        if self._user_id is not None:
+            return self._user_id
+
+        async with self._user_id_lock:
+            if self._user_id is None:
+                response = await send_with_retry(
+                    "GET",
+                    f"{self.base_url}/userinfo",
+                    headers={"Authorization": f"Bearer {self.access_token}"}
+                )
+                if response.status_code == 200:
+                    self._user_id = response.json().get("sub")
+        return self._user_id
 
     async def post(self, content: str, image_url: Optional[str] = None) -> Dict[str, Any]:
         if not self.enabled:
@@ -94,50 +216,42 @@ class LinkedInService:
             if not user_id:
                 return {"success": False, "error": "Could not get LinkedIn user ID"}
 
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json",
-                    "X-Restli-Protocol-Version": "2.0.0"
-                }
-
-                post_data = {
-                    "author": f"urn:li:person:{user_id}",
-                    "lifecycleState": "PUBLISHED",
-                    "specificContent": {
-                        "com.linkedin.ugc.ShareContent": {
-                            "shareCommentary": {
-                                "text": content
-                            },
-                            "shareMediaCategory": "NONE"
-                        }
-                    },
-                    "visibility": {
-                        "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
+            post_data = {
+                "author": f"urn:li:person:{user_id}",
+                "lifecycleState": "PUBLISHED",
+                "specificContent": {
+                    "com.linkedin.ugc.ShareContent": {
+                        "shareCommentary": {
+                            "text": content
+                        },
+                        "shareMediaCategory": "NONE"
                     }
-                }
+                },
+                "visibility": LINKEDIN_PUBLIC_VISIBILITY
+            }
 
-                # If image URL provided, we'd need to upload it first
-                # LinkedIn requires a complex image upload process
+            # If image URL provided, we'd need to upload it first
+            # LinkedIn requires a complex image upload process
 
-                response = await client.post(
-                    f"{self.base_url}/ugcPosts",
-                    headers=headers,
-                    json=post_data
-                )
+            response = await send_with_retry(
+                "POST",
+                f"{self.base_url}/ugcPosts",
+                headers=self._post_headers,
+                content=orjson.dumps(post_data)
+            )
 
-                if response.status_code in [200, 201]:
-                    return {
-                        "success": True,
-                        "post_id": response.headers.get("x-restli-id", ""),
-                        "platform": "linkedin"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": response.text,
-                        "platform": "linkedin"
-                    }
+            if response.status_code in [200, 201]:
+                return {
+                    "success": True,
+                    "post_id": response.headers.get("x-restli-id", ""),
+                    "platform": "linkedin"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": response.text,
+                    "platform": "linkedin"
+                }
 
         except Exception as e:
             return {"success": False, "error": str(e), "platform": "linkedin"}
@@ -154,52 +268,113 @@ class FacebookService:
         self.access_token = settings.facebook_page_access_token
         self.page_id = settings.facebook_page_id
         self.base_url = "https://graph.facebook.com/v18.0"
+        # Token and page never change, so build the endpoints once
+        self._feed_url = f"{self.base_url}/{self.page_id}/feed"
+        self._photos_url = f"{self.base_url}/{self.page_id}/photos"
+        self._base_params = {"access_token": self.access_token}
 
     async def post(self, content: str, image_url: Optional[str] = None) -> Dict[str, Any]:
         if not self.enabled:
             return {"success": False, "error": "Facebook not configured"}
 
         try:
-            async with httpx.AsyncClient() as client:
-                if image_url:
-                    # Post with image
-                    response = await client.post(
-                        f"{self.base_url}/{self.page_id}/photos",
-                        params={
-                            "access_token": self.access_token,
-                            "url": image_url,
-                            "message": content
-                        }
-                    )
-                else:
-                    # Text-only post
-                    response = await client.post(
-                        f"{self.base_url}/{self.page_id}/feed",
-                        params={
-                            "access_token": self.access_token,
-                            "message": content
-                        }
-                    )
-
-                data = response.json()
-
-                if "id" in data:
-                    return {
-                        "success": True,
-                        "post_id": data["id"],
-                        "platform": "facebook"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": data.get("error", {}).get("message", "Unknown error"),
-                        "platform": "facebook"
-                    }
+            if image_url:
+                # Post with image
+                response = await send_with_retry(
+                    "POST",
+                    self._photos_url,
+                    params={**self._base_params, "url": image_url, "message": content}
+                )
+            else:
+                # Text-only post
+                response = await send_with_retry(
+                    "POST",
+                    self._feed_url,
+                    params={**self._base_params, "message": content}
+                )
+
+            data = response.json()
+
+            if "id" in data:
+                return {
+                    "success": True,
+                    "post_id": data["id"],
+                    "platform": "facebook"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": data.get("error", {}).get("message", "Unknown error"),
+                    "platform": "facebook"
+                }
 
         except Exception as e:
             return {"success": False, "error": str(e), "platform": "facebook"}
 
 
+    async def post_batch(self, items: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Publish several (content, image_url) Page posts through Graph API
+        batch requests, returning one result per item in input order."""
+        if not self.enabled:
+            return [{"success": False, "error": "Facebook not configured", "platform": "facebook"} for _ in items]
+
+        results = []
+        for start in range(0, len(items), FACEBOOK_BATCH_LIMIT):
+            chunk = items[start:start + FACEBOOK_BATCH_LIMIT]
+            try:
+                results.extend(await self._post_batch_chunk(chunk))
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # Never reached Graph, so nothing was posted
+                results.extend({"success": False, "error": str(e), "platform": "facebook"} for _ in chunk)
+            except Exception as e:
+                # Timed out or broke off after sending: Graph may have run some
+                # or all of the batch, so don't report these posts as failed
+                error = f"Outcome unknown ({type(e).__name__}: {e})"
+                results.extend(
+                    {"success": False, "unknown": True, "error": error, "platform": "facebook"}
+                    for _ in chunk
+                )
+        return results
+
+    async def _post_batch_chunk(self, chunk: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        batch = []
+        for content, image_url in chunk:
+            if image_url:
+                relative_url = f"{self.page_id}/photos"
+                body = urlencode({"url": image_url, "message": content})
+            else:
+                relative_url = f"{self.page_id}/feed"
+                body = urlencode({"message": content})
+            batch.append({"method": "POST", "relative_url": relative_url, "body": body})
+
+        # Sent once, without send_with_retry: a batch can be partly executed
+        # before a gateway error, and resending it would duplicate those posts
+        response = await get_http_client().post(
+            f"{self.base_url}/",
+            data={**self._base_params, "batch": orjson.dumps(batch).decode()},
+            timeout=FACEBOOK_BATCH_TIMEOUT
+        )
+        data = response.json()
+
+        if not isinstance(data, list):
+            error = data.get("error", {}).get("message", "Unknown error")
+            return [{"success": False, "error": error, "platform": "facebook"} for _ in chunk]
+
+        results = []
+        for item in data:
+            # Each entry wraps its own response; null means it never ran
+            body = orjson.loads(item["body"]) if item and item.get("body") else {}
+            if "id" in body:
+                results.append({"success": True, "post_id": body["id"], "platform": "facebook"})
+            else:
+                results.append({
+                    "success": False,
+                    "error": body.get("error", {}).get("message", "Unknown error"),
+                    "platform": "facebook"
+                })
+        return results
+
+
 class InstagramService:
     """Instagram API Service (via Facebook Graph API)."""
 
@@ -211,6 +386,9 @@ class InstagramService:
         self.access_token = settings.facebook_page_access_token
         self.ig_user_id = settings.instagram_account_id
         self.base_url = "https://graph.facebook.com/v18.0"
+        self._media_url = f"{self.base_url}/{self.ig_user_id}/media"
+        self._publish_url = f"{self.base_url}/{self.ig_user_id}/media_publish"
+        self._base_params = {"access_token": self.access_token}
 
     async def post(self, content: str, image_url: str) -> Dict[str, Any]:
         """
@@ -224,51 +402,45 @@ class InstagramService:
             return {"success": False, "error": "Instagram requires an image URL", "platform": "instagram"}
 
         try:
-            async with httpx.AsyncClient() as client:
-                # Step 1: Create media container
-                container_response = await client.post(
-                    f"{self.base_url}/{self.ig_user_id}/media",
-                    params={
-                        "access_token": self.access_token,
-                        "image_url": image_url,
-                        "caption": content
-                    }
-                )
+            # Step 1: Create media container
+            container_response = await send_with_retry(
+                "POST",
+                self._media_url,
+                params={**self._base_params, "image_url": image_url, "caption": content}
+            )
 
-                container_data = container_response.json()
+            container_data = container_response.json()
 
-                if "id" not in container_data:
-                    return {
-                        "success": False,
-                        "error": container_data.get("error", {}).get("message", "Failed to create media container"),
-                        "platform": "instagram"
-                    }
+            if "id" not in container_data:
+                return {
+                    "success": False,
+                    "error": container_data.get("error", {}).get("message", "Failed to create media container"),
+                    "platform": "instagram"
+                }
 
-                container_id = container_data["id"]
+            container_id = container_data["id"]
 
-                # Step 2: Publish the container
-                publish_response = await client.post(
-                    f"{self.base_url}/{self.ig_user_id}/media_publish",
-                    params={
-                        "access_token": self.access_token,
-                        "creation_id": container_id
-                    }
-                )
+            # Step 2: Publish the container
+            publish_response = await send_with_retry(
+                "POST",
+                self._publish_url,
+                params={**self._base_params, "creation_id": container_id}
+            )
 
-                publish_data = publish_response.json()
+            publish_data = publish_response.json()
 
-                if "id" in publish_data:
-                    return {
-                        "success": True,
-                        "post_id": publish_data["id"],
-                        "platform": "instagram"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": publish_data.get("error", {}).get("message", "Failed to publish"),
-                        "platform": "instagram"
-                    }
+            if "id" in publish_data:
+                return {
+                    "success": True,
+                    "post_id": publish_data["id"],
+                    "platform": "instagram"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": publish_data.get("error", {}).get("message", "Failed to publish"),
+                    "platform": "instagram"
+                }
 
         except Exception as e:
             return {"success": False, "error": str(e), "platform": "instagram"}
@@ -282,14 +454,59 @@ class SocialMediaManager:
         self.linkedin = LinkedInService()
         self.facebook = FacebookService()
         self.instagram = InstagramService()
+        # platform -> (service, handler(content, image_url, image_path))
+        self._handlers: Dict[str, Tuple[Any, Callable[..., Awaitable[Dict[str, Any]]]]] = {
+            "twitter": (self.twitter, lambda content, image_url, image_path: self.twitter.post(content, image_path)),
+            "linkedin": (self.linkedin, lambda content, image_url, image_path: self.linkedin.post(content, image_url)),
+            "facebook": (self.facebook, lambda content, image_url, image_path: self.facebook.post(content, image_url)),
+            "instagram": (self.instagram, self._post_to_instagram),
+        }
+
+    async def warmup(self):
+        """Open the shared HTTP client and resolve the LinkedIn user ID up front
+        so the first scheduled publish doesn't pay for them."""
+        get_http_client()
+        if self.linkedin.enabled:
+            try:
+                await asyncio.wait_for(self.linkedin.get_user_id(), PLATFORM_TIMEOUT)
+            except Exception as e:
+                # Not fatal: the first LinkedIn post will look it up again
+                logger.warning(f"LinkedIn warm-up failed: {e}")
 
     def get_enabled_platforms(self) -> Dict[str, bool]:
         """Return which platforms are configured."""
+        return {platform: service.enabled for platform, (service, _) in self._handlers.items()}
+
+    async def post_to_platform(
+        self,
+        platform: str,
+        content: str,
+        image_url: Optional[str] = None,
+        image_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Post content to a single platform."""
+        entry = self._handlers.get(platform)
+        if entry is not None and entry[0].enabled:
+            return await entry[1](content, image_url, image_path)
+
         return {
-            "twitter": self.twitter.enabled,
-            "linkedin": self.linkedin.enabled,
-            "facebook": self.facebook.enabled,
-            "instagram": self.instagram.enabled
+            "success": False,
+            "error": f"{platform} not configured or not recognized",
+            "platform": platform
+        }
+
+    async def _post_to_instagram(
+        self,
+        content: str,
+        image_url: Optional[str],
+        image_path: Optional[str]
+    ) -> Dict[str, Any]:
+        if image_url:
+            return await self.instagram.post(content, image_url)
+        return {
+            "success": False,
+            "error": "Instagram requires an image",
+            "platform": "instagram"
         }
 
     async def post_to_platforms(
@@ -299,44 +516,47 @@ class SocialMediaManager:
         image_url: Optional[str] = None,
         image_path: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Post content to multiple platforms."""
-        results = {}
-
-        for platform in platforms:
-            if platform == "twitter" and self.twitter.enabled:
-                results["twitter"] = await self.twitter.post(content, image_path)
-
-            elif platform == "linkedin" and self.linkedin.enabled:
-                results["linkedin"] = await self.linkedin.post(content, image_url)
-
-            elif platform == "facebook" and self.facebook.enabled:
-                results["facebook"] = await self.facebook.post(content, image_url)
-
-            elif platform == "instagram" and self.instagram.enabled:
-                if image_url:
-                    results["instagram"] = await self.instagram.post(content, image_url)
-                else:
-                    results["instagram"] = {
-                        "success": False,
-                        "error": "Instagram requires an image",
-                        "platform": "instagram"
-                    }
-            else:
-                results[platform] = {
-                    "success": False,
-                    "error": f"{platform} not configured or not recognized",
-                    "platform": platform
-                }
+        """Post content to multiple platforms concurrently."""
+        # Results are keyed by platform, so a repeated entry would leave an
+        # extra coroutine that is never awaited
+        platforms = list(dict.fromkeys(platforms))
+        coros = {
+            platform: (
+                self.post_to_platform(platform, content, image_url, image_path)
+                if platform in THREADED_PLATFORMS
+                else asyncio.wait_for(
+                    self.post_to_platform(platform, content, image_url, image_path),
+                    timeout=PLATFORM_TIMEOUT
+                )
+            )
+            for platform in platforms
+        }
+        results = await asyncio.gather(*coros.values(), return_exceptions=True)
 
-        return results
+        return {
+            platform: result if not isinstance(result, BaseException) else {
+                "success": False,
+                "error": "Timed out" if isinstance(result, asyncio.TimeoutError) else str(result),
+                "platform": platform
+            }
+            for platform, result in zip(coros, results)
+        }
 
 
-# Singleton instance
-_social_media_manager: Optional[SocialMediaManager] = None
+def split_results(results: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, str], List[str]]:
+    """Fold per-platform results into (post IDs of the successes, error
+    strings of the failures) in a single pass."""
+    posted_ids = {}
+    errors = []
+    for platform, result in results.items():
+        if result.get("success"):
+            posted_ids[platform] = result.get("post_id", "")
+        else:
+            errors.append(f"{platform}: {result.get('error', 'Unknown')}")
+    return posted_ids, errors
 
 
+# Singleton instance
+@lru_cache()
 def get_social_media_manager() -> SocialMediaManager:
-    global _social_media_manager
-    if _social_media_manager is None:
-        _social_media_manager = SocialMediaManager()
-    return _social_media_manager
+    return SocialMediaManager()
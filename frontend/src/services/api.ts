@@ -65,7 +65,8 @@ export interface PlatformStatus {
 
 // Posts API
 export const postsApi = {
-  async list(params?: { status?: string; content_type?: string; limit?: number; offset?: number }) {
+  // Pass the previous page's next_cursor as `cursor` to fetch the next page
+  async list(params?: { status?: string; content_type?: string; limit?: number; cursor?: string; include_total?: boolean; summary?: boolean }): Promise<{ posts: Post[]; next_cursor?: string | null; limit?: number; total?: number }> {
     const response = await api.get('/posts', { params });
     return response.data;
   },